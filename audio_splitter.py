@@ -0,0 +1,137 @@
+import os
+import re
+
+from postprocess_pool import PostProcessError, find_ffmpeg, run_to_file
+
+# 分割后至少要有这么多段才有意义
+MIN_TRACKS = 2
+# CUE 时间中的帧：每秒 75 帧
+CUE_FRAMES_PER_SECOND = 75
+
+_TIMESTAMP_RE = re.compile(r'(?<![\d:])(?:(\d{1,2}):)?(\d{1,2}):(\d{2})(?:\.(\d{1,3}))?(?![\d:])')
+_CUE_INDEX_RE = re.compile(r'INDEX\s+01\s+(\d+):(\d{2}):(\d{2})', re.IGNORECASE)
+_CUE_FIELD_RE = re.compile(r'^\s*(TITLE|PERFORMER)\s+"?(.*?)"?\s*$', re.IGNORECASE)
+_TRACK_NUMBER_RE = re.compile(r'^\s*\d{1,3}\s*[.、)\]]\s*')
+_SEPARATORS = " \t-–—|·•:：、"
+
+
+# -- 时间轴解析 --
+def parse_timestamp(text):
+    """"1:02:03" / "02:03.5" -> 秒数；不是时间戳时返回 None"""
+    match = _TIMESTAMP_RE.fullmatch(text.strip())
+    if not match:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    value = int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+    if fraction:
+        value += int(fraction) / 10 ** len(fraction)
+    return float(value)
+
+def parse_cue_sheet(text):
+    """解析 CUE 文件，返回 ([章节], 专辑信息)；章节没有 end_time"""
+    album = {}
+    chapters = []
+    current = None
+    for line in text.splitlines():
+        if line.strip().upper().startswith("TRACK "):
+            current = {'title': "", 'performer': ""}
+            chapters.append(current)
+            continue
+        field = _CUE_FIELD_RE.match(line)
+        if field:
+            target = current if current is not None else album
+            target[field.group(1).lower()] = field.group(2)
+            continue
+        index = _CUE_INDEX_RE.search(line)
+        if index and current is not None:
+            minutes, seconds, frames = (int(v) for v in index.groups())
+            current['start_time'] = minutes * 60 + seconds + frames / CUE_FRAMES_PER_SECOND
+    return [c for c in chapters if 'start_time' in c], album
+
+def parse_timestamp_list(text):
+    """解析评论区常见的时间轴，如 "00:00 开场" / "1. 03:25 歌名 - 歌手" / "歌名 1:02:03" """
+    chapters = []
+    for line in text.splitlines():
+        match = _TIMESTAMP_RE.search(line)
+        if not match:
+            continue
+        title = (line[:match.start()] + " " + line[match.end():]).strip(_SEPARATORS)
+        title = _TRACK_NUMBER_RE.sub("", title).strip(_SEPARATORS)
+        chapters.append({'start_time': parse_timestamp(match.group(0)), 'title': title})
+    return chapters
+
+def parse_cue(text, duration=None):
+    """解析用户提供的 CUE 或时间轴文本，返回按开始时间排序、补全了 end_time 的章节列表"""
+    if re.search(r'^\s*TRACK\s+\d+', text or "", re.IGNORECASE | re.MULTILINE):
+        chapters, album = parse_cue_sheet(text)
+        for chapter in chapters:
+            chapter['performer'] = chapter.get('performer') or album.get('performer', "")
+    else:
+        chapters = parse_timestamp_list(text or "")
+    return normalize_chapters(chapters, duration)
+
+def normalize_chapters(chapters, duration=None):
+    """排序、去掉重复的开始时间，并用下一段的开始时间补全 end_time"""
+    result = []
+    for chapter in sorted(chapters, key=lambda c: c['start_time']):
+        if duration and chapter['start_time'] >= duration:
+            continue
+        if result and chapter['start_time'] <= result[-1]['start_time']:
+            continue
+        result.append(dict(chapter))
+    for current, following in zip(result, result[1:]):
+        current['end_time'] = following['start_time']
+    if result:
+        # 最后一段没有 end_time 时一直切到文件末尾
+        result[-1]['end_time'] = duration or result[-1].get('end_time')
+    return result
+
+def chapters_from_info(info):
+    """yt-dlp 信息中的章节（[{start_time, end_time, title}]）"""
+    chapters = [c for c in (info.get('chapters') or []) if c.get('start_time') is not None]
+    return normalize_chapters(chapters, info.get('duration'))
+
+
+# -- 分割 --
+def clean_filename(name):
+    return re.sub(r'[\\/*?:"<>|]', "_", name).strip() or "untitled"
+
+def plan_tracks(src, chapters, album="", artist="", date=""):
+    """每段一个输出文件，放在与源文件同名的目录中；返回 [(输出路径, 开始, 结束, 标签)]"""
+    stem, ext = os.path.splitext(src)
+    count = len(chapters)
+    tracks = []
+    for number, chapter in enumerate(chapters, 1):
+        title = chapter.get('title') or f"Track {number}"
+        tags = {
+            'title': title,
+            'artist': chapter.get('performer') or artist,
+            'album': album,
+            'album_artist': artist,
+            'track': f"{number}/{count}",
+            'date': date,
+        }
+        dst = os.path.join(stem, f"{number:02d} {clean_filename(title)}{ext}")
+        tracks.append((dst, chapter['start_time'], chapter.get('end_time'),
+                       {k: v for k, v in tags.items() if v}))
+    return tracks
+
+def build_cut_command(ffmpeg, src, dst, start, end, tags):
+    # -ss 放在 -i 之前按输入定位，配合 -c copy 直接从最近的音频帧开始复制，不解码；
+    # 音频的每一帧都可以独立解码，切点总是落在帧边界上
+    command = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y',
+               '-ss', f"{start:.3f}", '-i', src]
+    if end is not None:
+        command += ['-t', f"{max(0.0, end - start):.3f}"]
+    command += ['-map', '0:a', '-c', 'copy', '-map_metadata', '-1']
+    for key, value in tags.items():
+        command += ['-metadata', f"{key}={value}"]
+    return command + [dst]
+
+def cut_track(src, dst, start, end, tags, token=None, ffmpeg=None):
+    """用流复制切出一段，返回输出路径"""
+    ffmpeg = ffmpeg or find_ffmpeg()
+    if not ffmpeg:
+        raise PostProcessError("未找到 ffmpeg，无法分割音频")
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    return run_to_file(lambda tmp: build_cut_command(ffmpeg, src, tmp, start, end, tags), dst, token)
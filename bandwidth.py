@@ -0,0 +1,193 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# 流量类别
+TRAFFIC_INTERACTIVE = 'interactive'  # 用户正在等待的请求：搜索、歌词搜索对话框
+TRAFFIC_LYRICS = 'lyrics'            # 后台歌词下载、批量匹配
+TRAFFIC_BULK = 'bulk'                # 视频/音频下载
+
+TRAFFIC_CLASSES = (TRAFFIC_INTERACTIVE, TRAFFIC_LYRICS, TRAFFIC_BULK)
+TRAFFIC_CLASS_TEXT = {
+    TRAFFIC_INTERACTIVE: "交互",
+    TRAFFIC_LYRICS: "歌词",
+    TRAFFIC_BULK: "下载",
+}
+
+# 每类每秒字节数，0 表示不限速
+DEFAULT_BUDGETS = {
+    TRAFFIC_INTERACTIVE: 0,
+    TRAFFIC_LYRICS: 0,
+    TRAFFIC_BULK: 0,
+}
+# 有交互请求进行中时，下载最多使用的带宽，给交互请求让出上行/下行
+PREEMPTED_BULK_RATE = 64 * 1024
+# 令牌桶容量（秒）：空闲后允许的突发量
+BURST_SECONDS = 0.5
+# 实时流量按最近这么多秒计算
+THROUGHPUT_WINDOW = 2.0
+# 等待令牌时每次最多睡这么久，以便及时响应限速变化和取消
+MAX_WAIT_SLICE = 0.1
+
+
+# --- 令牌桶：允许透支，透支的部分由之后的调用方等待偿还 ---
+class TokenBucket:
+    def __init__(self, rate=0):
+        self.rate = rate
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+    def refill(self, now, rate):
+        if rate <= 0:
+            # 不限速时清掉欠账，恢复限速后不会突然卡住
+            self.tokens = 0.0
+        else:
+            self.tokens = min(rate * BURST_SECONDS, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+# --- 全局带宽调度：按流量类别限速，交互请求进行时压低下载速度 ---
+class BandwidthScheduler:
+    def __init__(self, budgets=None):
+        self._cond = threading.Condition()
+        self._budgets = dict(DEFAULT_BUDGETS)
+        self._budgets.update(budgets or {})
+        self._buckets = {cls: TokenBucket() for cls in TRAFFIC_CLASSES}
+        self._active = {cls: 0 for cls in TRAFFIC_CLASSES}
+        self._samples = {cls: deque() for cls in TRAFFIC_CLASSES}
+        # 其他进程（下载工作进程/主进程）报告的进行中请求数和实时速度
+        self._remote_active = {cls: 0 for cls in TRAFFIC_CLASSES}
+        self._remote_throughput = {cls: 0.0 for cls in TRAFFIC_CLASSES}
+        # 限速或交互请求数变化时通知，回调参数为 (限速, 交互请求数)，在变化所在的线程中调用
+        self._listeners = []
+
+    # -- 限速设置（运行时可改） --
+    def budget(self, traffic_class):
+        with self._cond:
+            return self._budgets[traffic_class]
+
+    def budgets(self):
+        with self._cond:
+            return dict(self._budgets)
+
+    def set_budget(self, traffic_class, bytes_per_second):
+        with self._cond:
+            self._budgets[traffic_class] = max(0, int(bytes_per_second or 0))
+            self._cond.notify_all()
+        self._notify()
+
+    def set_budgets(self, budgets):
+        with self._cond:
+            self._budgets.update(budgets)
+            self._cond.notify_all()
+
+    def _effective_rate(self, traffic_class):
+        rate = self._budgets[traffic_class]
+        interactive = self._active[TRAFFIC_INTERACTIVE] + self._remote_active[TRAFFIC_INTERACTIVE]
+        if traffic_class == TRAFFIC_BULK and interactive:
+            rate = min(rate, PREEMPTED_BULK_RATE) if rate else PREEMPTED_BULK_RATE
+        return rate
+
+    # -- 流量控制 --
+    @contextmanager
+    def transfer(self, traffic_class):
+        """标记一个进行中的请求；交互请求进行期间下载被限速"""
+        with self._cond:
+            self._active[traffic_class] += 1
+        if traffic_class == TRAFFIC_INTERACTIVE:
+            self._notify()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[traffic_class] -= 1
+                self._cond.notify_all()
+            if traffic_class == TRAFFIC_INTERACTIVE:
+                self._notify()
+
+    def consume(self, traffic_class, size, token=None):
+        """记录 size 字节的传输，超出该类别的限速时阻塞到额度足够；被取消时返回 False"""
+        if size <= 0:
+            return True
+        with self._cond:
+            now = time.monotonic()
+            self._record(traffic_class, now, size)
+            bucket = self._buckets[traffic_class]
+            bucket.refill(now, self._effective_rate(traffic_class))
+            bucket.tokens -= size
+            while bucket.tokens < 0:
+                rate = self._effective_rate(traffic_class)
+                if rate <= 0:
+                    bucket.tokens = 0.0
+                    break
+                if token is not None and token.is_canceled:
+                    return False
+                # 限速变化或交互请求结束时会被提前唤醒
+                self._cond.wait(min(-bucket.tokens / rate, MAX_WAIT_SLICE))
+                bucket.refill(time.monotonic(), self._effective_rate(traffic_class))
+        return True
+
+    # -- 跨进程同步 --
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self):
+        if not self._listeners:
+            return
+        with self._cond:
+            budgets = dict(self._budgets)
+            interactive = self._active[TRAFFIC_INTERACTIVE]
+        for callback in list(self._listeners):
+            callback(budgets, interactive)
+
+    def set_remote_active(self, traffic_class, count):
+        with self._cond:
+            self._remote_active[traffic_class] = count
+            self._cond.notify_all()
+
+    def set_remote_throughput(self, rates):
+        with self._cond:
+            self._remote_throughput.update(rates)
+
+    # -- 实时流量 --
+    def _record(self, traffic_class, now, size):
+        samples = self._samples[traffic_class]
+        samples.append((now, size))
+        self._prune(samples, now)
+
+    def _prune(self, samples, now):
+        while samples and now - samples[0][0] > THROUGHPUT_WINDOW:
+            samples.popleft()
+
+    def throughput(self):
+        """各类别最近的传输速度（字节/秒）"""
+        now = time.monotonic()
+        with self._cond:
+            result = {}
+            for cls, samples in self._samples.items():
+                self._prune(samples, now)
+                result[cls] = (sum(size for _, size in samples) / THROUGHPUT_WINDOW
+                               + self._remote_throughput[cls])
+            return result
+
+    def active_count(self, traffic_class):
+        with self._cond:
+            return self._active[traffic_class] + self._remote_active[traffic_class]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_bandwidth_scheduler():
+    """所有网络流量共用的带宽调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = BandwidthScheduler()
+    return _scheduler
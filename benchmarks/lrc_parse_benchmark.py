@@ -0,0 +1,119 @@
+"""LRC 解析基准测试
+
+用法:
+    python benchmarks/lrc_parse_benchmark.py [歌词目录] [--files N]
+
+指定目录时解析其中所有 .lrc 文件；否则生成 N 个（默认 5000）合成歌词文件再解析。
+另外解析合成的逐字歌词（yrc 和 klyric 两种写法），并检查每行字的开始时间递增。
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lrc_parser import load_lrc_file, parse_word_lyric
+
+
+def generate_corpus(directory, count, lines_per_file=60):
+    random.seed(42)
+    words = ["晴天", "夜曲", "love", "rain", "回忆", "city", "light", "告白", "星空", "dream"]
+    for n in range(count):
+        rows = ["[ti:song %d]" % n, "[ar:artist]", "[offset:%d]" % random.choice((0, 0, 200, -150))]
+        t = 0
+        for _ in range(lines_per_file):
+            t += random.randint(1500, 6000)
+            text = " ".join(random.choice(words) for _ in range(random.randint(2, 6)))
+            stamp = "[%02d:%02d.%02d]" % (t // 60000, t // 1000 % 60, t // 10 % 100)
+            if random.random() < 0.1:
+                # 副歌重复：同一行多个时间标签
+                t2 = t + 60000
+                stamp += "[%02d:%02d.%02d]" % (t2 // 60000, t2 // 1000 % 60, t2 // 10 % 100)
+            rows.append(stamp + text)
+        with open(os.path.join(directory, "%05d.lrc" % n), "w", encoding="utf-8") as f:
+            f.write("\n".join(rows))
+
+
+def generate_word_lyric(kind, lines=60, words_per_line=8):
+    """合成逐字歌词：yrc 中字的开始为绝对时间，klyric 中字的开始都写成 0"""
+    random.seed(7)
+    rows = []
+    t = 0
+    for _ in range(lines):
+        t += random.randint(1500, 6000)
+        durations = [random.randint(100, 600) for _ in range(words_per_line)]
+        parts = []
+        word_start = t
+        for n, duration in enumerate(durations):
+            start = word_start if kind == "yrc" else 0
+            parts.append(f"({start},{duration},0)字{n}")
+            word_start += duration
+        rows.append(f"[{t},{sum(durations)}]" + "".join(parts))
+    return "\n".join(rows)
+
+
+def run_word_lyrics(repeat=200):
+    for kind in ("yrc", "klyric"):
+        text = generate_word_lyric(kind)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            lines = parse_word_lyric(text)
+        elapsed = time.perf_counter() - start
+        ordered = all(all(a < b for a, b in zip(words.starts, words.starts[1:]))
+                      and words.starts[0] == line_start
+                      for line_start, words in lines)
+        print(f"逐字歌词 {kind:>6}: {len(lines)} 行  {elapsed / repeat * 1e3:.3f} ms/首  "
+              f"字时间递增: {'是' if ordered else '否'}")
+
+
+def run(directory):
+    paths = [os.path.join(root, name)
+             for root, _, names in os.walk(directory)
+             for name in names if name.lower().endswith(".lrc")]
+    if not paths:
+        print("没有找到 .lrc 文件")
+        return
+
+    start = time.perf_counter()
+    timelines = [load_lrc_file(p) for p in paths]
+    parse_time = time.perf_counter() - start
+    total_lines = sum(len(t) for t in timelines)
+
+    # 每首歌模拟 1000 次当前行查询
+    start = time.perf_counter()
+    lookups = 0
+    for timeline in timelines:
+        if not timeline:
+            continue
+        end = timeline.times[-1] + 5000
+        for ms in range(0, end, max(1, end // 1000)):
+            timeline.index_at(ms)
+            lookups += 1
+    lookup_time = time.perf_counter() - start
+
+    print(f"文件数: {len(paths)}  歌词行数: {total_lines}")
+    print(f"解析: {parse_time:.3f}s  ({len(paths) / parse_time:.0f} 文件/s, {total_lines / parse_time:.0f} 行/s)")
+    if lookups:
+        print(f"查询: {lookups} 次  平均 {lookup_time / lookups * 1e6:.2f} µs/次")
+    run_word_lyrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LRC 解析基准测试")
+    parser.add_argument("directory", nargs="?", help="包含 .lrc 文件的目录")
+    parser.add_argument("--files", type=int, default=5000, help="合成歌词文件数量")
+    args = parser.parse_args()
+
+    if args.directory:
+        run(args.directory)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(tmp, args.files)
+        run(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""后处理流水线基准测试：串行 vs 下载/转码流水线
+
+用法:
+    python benchmarks/postprocess_benchmark.py [音频目录] [--files N] [--format mp3]
+                                               [--download-delay 秒] [--workers N]
+
+指定目录时使用其中的音频文件；否则用 ffmpeg 生成 N 个（默认 16）60 秒的测试音频。
+“下载”用 --download-delay 模拟每个文件的网络耗时（复制文件后等待），
+串行模式下载完一个就地转码再下载下一个；流水线模式把转码交给后处理池后立即下载下一个。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from postprocess_pool import PostProcessPool, find_ffmpeg, run_ffmpeg
+
+# 与 local_scanner.AUDIO_EXTENSIONS 一致；这里不导入它以免依赖 PyQt5
+AUDIO_EXTENSIONS = {'.mp3', '.flac', '.m4a', '.aac', '.ogg', '.opus', '.wav', '.wma', '.ape'}
+
+
+def generate_samples(ffmpeg, directory, count, seconds=60):
+    for n in range(count):
+        path = os.path.join(directory, "%03d.wav" % n)
+        subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-f', 'lavfi',
+                        '-i', f"sine=frequency={220 + n * 20}:duration={seconds}", path], check=True)
+
+
+def fake_download(src, directory, delay):
+    dst = os.path.join(directory, os.path.basename(src))
+    shutil.copyfile(src, dst)
+    time.sleep(delay)
+    return dst
+
+
+def run_serial(samples, workdir, output_format, delay):
+    start = time.perf_counter()
+    for src in samples:
+        run_ffmpeg(fake_download(src, workdir, delay), output_format)
+    return time.perf_counter() - start
+
+
+def run_pipelined(samples, workdir, output_format, delay, workers):
+    pool = PostProcessPool(max_workers=workers)
+    start = time.perf_counter()
+    futures = [pool.submit(fake_download(src, workdir, delay), output_format) for src in samples]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    pool.shutdown(wait=True)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后处理流水线基准测试")
+    parser.add_argument("directory", nargs="?", help="包含音频文件的目录")
+    parser.add_argument("--files", type=int, default=16, help="生成的测试音频数量")
+    parser.add_argument("--format", default="mp3", choices=("mp3", "opus", "m4a"), help="输出格式")
+    parser.add_argument("--download-delay", type=float, default=0.5, help="模拟每个文件的下载耗时（秒）")
+    parser.add_argument("--workers", type=int, default=None, help="后处理并发数（默认 CPU 核数）")
+    args = parser.parse_args()
+
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        print("没有找到 ffmpeg")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = args.directory
+        if not source_dir:
+            source_dir = os.path.join(tmp, "samples")
+            os.makedirs(source_dir)
+            generate_samples(ffmpeg, source_dir, args.files)
+        samples = sorted(os.path.join(source_dir, name) for name in os.listdir(source_dir)
+                         if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS)
+        # 目标格式与源文件相同时不会做任何处理，跳过这些文件
+        samples = [p for p in samples if not p.lower().endswith("." + args.format)]
+        if not samples:
+            print("没有可处理的音频文件")
+            return
+
+        results = {}
+        for name in ("serial", "pipelined"):
+            workdir = os.path.join(tmp, name)
+            os.makedirs(workdir)
+            if name == "serial":
+                results[name] = run_serial(samples, workdir, args.format, args.download_delay)
+            else:
+                results[name] = run_pipelined(samples, workdir, args.format, args.download_delay, args.workers)
+
+    print(f"文件数: {len(samples)}  格式: {args.format}  模拟下载: {args.download_delay}s/个  "
+          f"后处理并发: {args.workers or os.cpu_count()}")
+    for name, elapsed in results.items():
+        print(f"{name:>9}: {elapsed:.2f}s  ({len(samples) / elapsed * 60:.1f} 个/分钟)")
+    print(f"加速比: {results['serial'] / results['pipelined']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
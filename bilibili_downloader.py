@@ -1,25 +1,86 @@
 import os
 import re
-from PyQt5.QtCore import QThread, pyqtSignal
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PyQt5.QtCore import pyqtSignal
+
+from task_executor import Task, LANE_DOWNLOAD, LANE_INTERACTIVE
+from download_archive import get_download_archive, archive_key, parse_video_id, parse_part
+from download_progress import ProgressTracker, DEFAULT_MAX_UPDATES_PER_SECOND
+from postprocess_pool import get_postprocess_pool, needs_processing, run_ffmpeg
+from bandwidth import get_bandwidth_scheduler, TRAFFIC_BULK
+from audio_splitter import MIN_TRACKS, chapters_from_info, parse_cue, plan_tracks, cut_track
 
 try:
     import yt_dlp
 except ImportError:
     yt_dlp = None
 
-class BilibiliDownloader(QThread):
-    progress_signal = pyqtSignal(str, int)  # 进度文本和百分比
+# 输出格式
+FORMAT_M4A = 'm4a'      # 仅音频，直接封装为 m4a，不转码
+FORMAT_MP3 = 'mp3'      # 仅音频，转码为 mp3
+FORMAT_OPUS = 'opus'    # 仅音频，转码为 opus
+FORMAT_VIDEO = 'mp4'    # 视频
+
+OUTPUT_FORMATS = [
+    (FORMAT_M4A, "仅音频 (M4A，不转码)"),
+    (FORMAT_MP3, "仅音频 (MP3)"),
+    (FORMAT_OPUS, "仅音频 (Opus)"),
+    (FORMAT_VIDEO, "视频 (MP4)"),
+]
+
+# 仅音频时选满足该码率（kbps）的最小音频流；B站音频流通常为 64/132/192 kbps
+AUDIO_MIN_ABR = 128
+AUDIO_FORMAT = f'worstaudio[abr>={AUDIO_MIN_ABR}]/bestaudio/best'
+VIDEO_FORMAT = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+
+# 播放列表并行下载的分P数，以及每个分P内并发下载的分片数
+DEFAULT_PARALLEL_ITEMS = 3
+CONCURRENT_FRAGMENTS = 4
+# yt-dlp 对每个文件最后运行的后处理：把文件移动到最终位置
+FINAL_POSTPROCESSOR = 'MoveFiles'
+
+class BilibiliDownloader(Task):
+    lane = LANE_DOWNLOAD
+    progress_signal = pyqtSignal(object)    # DownloadProgress
     finished_signal = pyqtSignal(str, str)  # 路径和文件名
     error_signal = pyqtSignal(str)          # 错误信息
 
-    def __init__(self, url, path, mode, start, end=None):
+    def __init__(self, url, path, mode, start, end=None, parallel_items=DEFAULT_PARALLEL_ITEMS,
+                 archive=None, max_updates_per_second=DEFAULT_MAX_UPDATES_PER_SECOND,
+                 output_format=FORMAT_M4A, split_tracks=False, cue_text=None, items=None):
         super().__init__()
         self.url = url
         self.path = path
         self.mode = mode  # 'single' 或 'playlist'
-        self.start = start
-        self.end = end
-        self.is_canceled = False
+        self.output_format = output_format
+        self.start_item = start  # 不能叫 start，会遮住 Task.start()
+        self.end_item = end
+        # 播放列表中选中的分P序号；为 None 时下载 start-end 范围
+        self.items = sorted(set(items)) if items else None
+        # 下载过的目标文件名（yt-dlp 在旁边写 .part 临时文件），供取消时清理
+        self.part_files = set()
+        # 播放列表模式下同时下载的分P数；1 表示按顺序交给一次 YoutubeDL.download
+        self.parallel_items = parallel_items
+        # 汇总各分P的字节进度，限制每秒推送给界面的次数
+        self.tracker = ProgressTracker(max_updates_per_second=max_updates_per_second)
+        # 下载档案：已下载过的 (视频 ID, 分P) 不再访问网络
+        self.archive = archive
+        self.video_id = parse_video_id(url)
+        self.skipped = 0
+        # 音频的转码/换封装交给共享的后处理池，下载线程继续下载下一个分P
+        self.postprocess_pool = None
+        self._postprocess_futures = []
+        self._postprocess_errors = []
+        self._postprocess_lock = threading.Lock()
+        # 下载流量计入全局带宽调度的 bulk 类别；记录各文件上次回调时的字节数以计算增量
+        self.bandwidth = get_bandwidth_scheduler()
+        self._hook_bytes = {}
+        self._hook_lock = threading.Lock()  # 并行下载时进度回调来自多个线程
+        # 按章节把长音频切成单曲（仅音频格式）；cue_text 为用户提供的 CUE/时间轴，只用于单个视频
+        self.split_tracks = split_tracks and output_format != FORMAT_VIDEO
+        self.cue_text = cue_text
 
     def run(self):
         if not yt_dlp:
@@ -30,18 +91,181 @@ class BilibiliDownloader(QThread):
         if not self._validate_and_create_directory():
             return
 
+        self.archive = self.archive or get_download_archive()
+        # 先查档案：范围已知时全部下载过就直接结束，不发任何请求
+        parts = self._known_parts()
+        missing = None
+        if parts is not None:
+            missing = self.archive.missing_parts(self._archive_key(self.video_id), parts)
+            self.skipped = len(parts) - len(missing)
+            if not missing:
+                self.finished_signal.emit(self.path, f"已下载过（{len(parts)} 个），跳过")
+                return
+
+        if self.mode == 'playlist' and self.parallel_items > 1:
+            self._run_parallel()
+            return
+
         # 配置下载选项
         opts = self._get_download_options()
+        if self.mode == 'playlist' and missing is not None:
+            opts['playlist_items'] = ",".join(str(part) for part in missing)
+            self.tracker.item_count = len(missing)
 
         try:
             with yt_dlp.YoutubeDL(opts) as ydl:
-                ydl.download([self.url])
-            if not self.is_canceled:
-                self.finished_signal.emit(self.path, "下载完成")
+                info = ydl.extract_info(self.url, download=True)
+            if self.output_format == FORMAT_VIDEO:
+                self._record_info(info)
+            failed = self._wait_postprocess()
+            if self.is_canceled:
+                return
+            if failed:
+                self.error_signal.emit(f"后处理失败: {failed}")
+            else:
+                self.finished_signal.emit(self.path, self._finished_text("下载完成"))
         except Exception as e:
             if not self.is_canceled:
                 self.error_signal.emit(f"下载失败: {str(e)}")
 
+    # -- 下载档案 --
+    def _known_parts(self):
+        """不访问网络就能确定的分P序号列表；确定不了时返回 None"""
+        if not self.video_id:
+            return None
+        if self.mode == 'single':
+            return [parse_part(self.url) or 1]
+        if self.items:
+            return list(self.items)
+        if self.end_item:
+            return list(range(max(1, self.start_item), self.end_item + 1))
+        return None
+
+    def _record_info(self, info):
+        """把 extract_info 返回的下载结果登记到档案"""
+        if not info or not self.video_id:
+            return
+        entries = info.get('entries')
+        if entries is None:
+            if self.mode == 'single':
+                part = parse_part(self.url) or 1
+            else:
+                part = info.get('playlist_index') or 1
+            self._record(self.video_id, part, info)
+            return
+        for entry in entries:
+            if entry:
+                self._record(self.video_id, entry.get('playlist_index') or 1, entry)
+
+    def _record(self, video_id, part, info):
+        downloads = info.get('requested_downloads') or [info]
+        self._record_path(video_id, part, downloads[-1].get('filepath'))
+
+    def _record_path(self, video_id, part, path):
+        if not video_id or not path or not os.path.exists(path):
+            return
+        try:
+            self.archive.record(self._archive_key(video_id), part, path)
+        except OSError as e:
+            print(f"无法登记下载档案: {path}: {e}")
+
+    def _archive_key(self, video_id):
+        variant = None if self.output_format == FORMAT_M4A else self.output_format
+        if self.split_tracks:
+            # 分割后的单曲与完整文件分开记录
+            variant = f"{variant or FORMAT_M4A}-tracks"
+        return archive_key(video_id, variant)
+
+    def _finished_text(self, text):
+        return f"{text}（跳过 {self.skipped} 个已下载的分P）" if self.skipped else text
+
+    # -- 播放列表并行下载 --
+    def _list_items(self):
+        """只取播放列表的条目（不解析每个分P的格式），返回所选范围内的 [(序号, 链接, 标题)]"""
+        opts = {'quiet': True, 'nocheckcertificate': True, 'extract_flat': 'in_playlist'}
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(self.url, download=False)
+        entries = list(info.get('entries') or [])
+        if not entries:
+            return [(1, self.url, info.get('title', ""))]
+
+        last = min(self.end_item or len(entries), len(entries))
+        numbers = range(max(1, self.start_item), last + 1)
+        if self.items:
+            numbers = [n for n in self.items if 1 <= n <= len(entries)]
+        items = []
+        for number in numbers:
+            entry = entries[number - 1] or {}
+            url = entry.get('url') or entry.get('webpage_url')
+            if not url:
+                continue
+            video_id = self.video_id or parse_video_id(url)
+            if video_id and self.archive.lookup(self._archive_key(video_id), number):
+                # 范围确定时 run() 已经统计过跳过的数量
+                if self._known_parts() is None:
+                    self.skipped += 1
+                continue
+            items.append((number, url, entry.get('title', "")))
+        return items
+
+    def _run_parallel(self):
+        try:
+            items = self._list_items()
+        except Exception as e:
+            if not self.is_canceled:
+                self.error_signal.emit(f"读取播放列表失败: {str(e)}")
+            return
+        if not items:
+            if self.skipped:
+                self.finished_signal.emit(self.path, self._finished_text("没有需要下载的分P"))
+            else:
+                self.error_signal.emit("所选范围内没有可下载的分P")
+            return
+
+        self.tracker.item_count = len(items)
+        failed = []
+        with ThreadPoolExecutor(max_workers=min(self.parallel_items, len(items))) as pool:
+            futures = {pool.submit(self._download_item, number, url): (number, title)
+                       for number, url, title in items}
+            for future in as_completed(futures):
+                number, title = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    if self.is_canceled:
+                        continue
+                    failed.append(number)
+                    print(f"分P {number} 下载失败 ({title}): {e}")
+            if self.is_canceled:
+                for future in futures:
+                    future.cancel()
+
+        postprocess_failed = self._wait_postprocess()
+        if self.is_canceled:
+            return
+        if postprocess_failed:
+            self.error_signal.emit(f"后处理失败: {postprocess_failed}")
+        elif failed:
+            numbers = ", ".join(str(n) for n in sorted(failed))
+            self.error_signal.emit(f"下载失败: {len(failed)}/{len(items)} 个分P未完成（P{numbers}）")
+        else:
+            self.finished_signal.emit(self.path, self._finished_text(f"下载完成（共 {len(items)} 个分P）"))
+
+    def _download_item(self, number, url):
+        if self.is_canceled:
+            return
+        opts = self._get_download_options()
+        opts.update({
+            'noplaylist': True,
+            'playlist_items': None,
+            'progress_hooks': [lambda d: self._progress_hook(d, number)],
+            'postprocessor_hooks': [lambda d: self._postprocessor_hook(d, number)],
+        })
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+        if self.output_format == FORMAT_VIDEO:
+            self._record(self.video_id or parse_video_id(url), number, info or {})
+
     def _validate_and_create_directory(self):
         try:
             if not os.path.exists(self.path):
@@ -58,47 +282,258 @@ class BilibiliDownloader(QThread):
         # 构建播放列表选项
         playlist_items = ""
         if self.mode == 'single':
-            playlist_items = str(self.start)
-        elif self.mode == 'playlist' and self.end:
-            playlist_items = f"{self.start}-{self.end}"
+            playlist_items = str(self.start_item)
+        elif self.mode == 'playlist' and self.items:
+            playlist_items = ",".join(str(n) for n in self.items)
+        elif self.mode == 'playlist' and self.end_item:
+            playlist_items = f"{self.start_item}-{self.end_item}"
         elif self.mode == 'playlist':
-            playlist_items = f"{self.start}-"
+            playlist_items = f"{self.start_item}-"
 
         # 清理标题中的特殊字符
         def clean_title(title):
             return re.sub(r'[\\/*?:"<>|]', "_", title)
 
-        return {
-            'format': 'bestaudio[ext=m4a]/best[ext=mp4]',
+        opts = {
+            'format': VIDEO_FORMAT if self.output_format == FORMAT_VIDEO else AUDIO_FORMAT,
             'outtmpl': os.path.join(self.path, f'{clean_title("%(title)s")}.%(ext)s'),
             'overwrites': False,
+            # 暂停或重启后从 .part 文件断点续传
+            'continuedl': True,
+            'concurrent_fragment_downloads': CONCURRENT_FRAGMENTS,
             'noplaylist': self.mode == 'single',
             'playlist_items': playlist_items,
             'progress_hooks': [self._progress_hook],
+            'postprocessor_hooks': [self._postprocessor_hook],
             'quiet': True,
             'nocheckcertificate': True,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }] if self.mode == 'audio' else [],
+            'postprocessors': [],
         }
+        if self.output_format == FORMAT_VIDEO:
+            opts['merge_output_format'] = 'mp4'
+        # 音频不在 yt-dlp 内处理：文件到达最终位置后交给后处理池（见 _postprocessor_hook）
+        return opts
 
-    def _progress_hook(self, d):
+    def _progress_hook(self, d, number=None):
         if self.is_canceled:
             raise Exception("下载已取消")
-            
+
+        if d.get('filename'):
+            self.part_files.add(d['filename'])
+        # 顺序下载播放列表时从 info_dict 取当前分P的序号
+        if number is None:
+            number = (d.get('info_dict') or {}).get('playlist_index') or 1
         if d['status'] == 'downloading':
-            percent = d.get('_percent_str', '0%').replace('%', '').strip()
-            try:
-                percent_int = int(float(percent))
-            except:
-                percent_int = 0
-                
-            filename = os.path.basename(d.get('filename', ''))[:20]
-            self.progress_signal.emit(f"正在下载: {filename}...", percent_int)
+            self._throttle(d)
+            progress = self.tracker.update(
+                number, d.get('downloaded_bytes'),
+                d.get('total_bytes') or d.get('total_bytes_estimate'), d.get('filename'))
+            if progress is not None:
+                self.progress_signal.emit(progress)
         elif d['status'] == 'finished':
-            self.progress_signal.emit("正在处理文件...", 100)
+            self.progress_signal.emit(self.tracker.finish_item(number))
+
+    def _postprocessor_hook(self, d, number=None):
+        """yt-dlp 对一个文件的处理（合并、移动）全部结束后，把最终文件交给后处理池"""
+        if d['status'] != 'finished' or d.get('postprocessor') != FINAL_POSTPROCESSOR:
+            return
+        info = d.get('info_dict') or {}
+        if self.output_format == FORMAT_VIDEO or not info.get('filepath'):
+            return
+        # 回调中的 info 是移动前的副本，按 MoveFiles 的规则得到最终路径
+        filepath = info['filepath']
+        path = os.path.join(info.get('__finaldir') or os.path.dirname(filepath), os.path.basename(filepath))
+        if number is None:
+            number = info.get('playlist_index') or 1
+        video_id = self.video_id or parse_video_id(info.get('webpage_url'))
+        part = (parse_part(self.url) or 1) if self.mode == 'single' else number
+        self._queue_postprocess(number, video_id, part, path, info)
+
+    def _throttle(self, d):
+        """在进度回调中按 bulk 额度阻塞下载线程；交互请求进行时额度会被压低"""
+        downloaded = d.get('downloaded_bytes') or 0
+        key = d.get('filename')
+        with self._hook_lock:
+            previous = self._hook_bytes.get(key)
+            self._hook_bytes[key] = downloaded
+        # 第一次回调可能包含断点续传已有的字节，只作为起点
+        if previous is None or downloaded <= previous:
+            return
+        if not self.bandwidth.consume(TRAFFIC_BULK, downloaded - previous, self.token):
+            raise Exception("下载已取消")
+
+    # -- 后处理 --
+    def _submit_postprocess(self, key, fn, *args, callback):
+        """把一次 ffmpeg 调用交给后处理池；key 用于统计进度，callback(结果, 异常) 在工作线程中调用"""
+        pool = self.postprocess_pool or get_postprocess_pool()
+        self.postprocess_pool = pool
+        self.progress_signal.emit(self.tracker.processing_submitted(key))
+
+        def done(result, error):
+            try:
+                callback(result, error)
+            finally:
+                self.progress_signal.emit(self.tracker.processing_finished(key))
+        future = pool.submit_call(fn, *args, callback=done)
+        with self._postprocess_lock:
+            self._postprocess_futures.append(future)
+
+    def _postprocess_failed(self, name, error):
+        if not self.is_canceled:
+            with self._postprocess_lock:
+                self._postprocess_errors.append(f"{name}: {error}")
+
+    def _queue_postprocess(self, number, video_id, part, src, info=None):
+        if not needs_processing(src, self.output_format):
+            self._after_postprocess(number, video_id, part, src, info or {})
+            return
+        self._submit_postprocess(
+            number, run_ffmpeg, src, self.output_format, self.token,
+            callback=lambda dst, error: self._on_postprocessed(number, video_id, part, src, info or {}, dst, error))
+
+    def _on_postprocessed(self, number, video_id, part, src, info, dst, error):
+        if error is None:
+            self._after_postprocess(number, video_id, part, dst, info)
+        else:
+            self._postprocess_failed(os.path.basename(src), error)
+
+    def _after_postprocess(self, number, video_id, part, path, info):
+        """格式处理完成：需要分割时切成单曲，否则直接登记档案"""
+        try:
+            chapters = self._chapters_for(info)
+        except Exception as e:
+            self._postprocess_failed(os.path.basename(path), f"无法解析时间轴: {e}")
+            return
+        if len(chapters) < MIN_TRACKS:
+            self._record_path(video_id, part, path)
+            return
+
+        upload_date = info.get('upload_date') or ""
+        tracks = plan_tracks(path, chapters, album=info.get('title', ""),
+                             artist=info.get('uploader', ""), date=upload_date[:4])
+        state = {'remaining': len(tracks), 'failed': False}
+        lock = threading.Lock()
+
+        def track_done(dst, error):
+            if error is not None:
+                self._postprocess_failed(os.path.basename(path), f"分割失败: {error}")
+            with lock:
+                state['failed'] = state['failed'] or error is not None
+                state['remaining'] -= 1
+                last = state['remaining'] == 0
+            if last and not state['failed'] and not self.is_canceled:
+                # 单曲全部切好后删除完整文件，档案中登记第一首
+                self._record_path(video_id, part, tracks[0][0])
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"无法删除已分割的文件: {path}: {e}")
+
+        # 各段互不依赖，同时交给后处理池
+        for index, (dst, start, end, tags) in enumerate(tracks, 1):
+            self._submit_postprocess((number, index), cut_track, path, dst, start, end, tags, self.token,
+                                     callback=track_done)
+
+    def _chapters_for(self, info):
+        if not self.split_tracks:
+            return []
+        if self.cue_text and self.mode == 'single':
+            return parse_cue(self.cue_text, info.get('duration'))
+        return chapters_from_info(info)
+
+    def _wait_postprocess(self):
+        """下载全部结束后等待剩余的后处理（包括处理中新加入的分割任务），返回错误说明"""
+        waited = 0
+        while True:
+            with self._postprocess_lock:
+                futures = self._postprocess_futures[waited:]
+            if not futures:
+                break
+            waited += len(futures)
+            for future in futures:
+                if self.is_canceled:
+                    future.cancel()
+                    continue
+                try:
+                    future.result()
+                except Exception:
+                    pass  # 错误已在回调中记录
+        if waited:
+            self.progress_signal.emit(self.tracker.snapshot())
+        with self._postprocess_lock:
+            return "; ".join(self._postprocess_errors)
 
     def cancel_download(self):
-        self.is_canceled = True
+        self.cancel()
+
+
+# 预览时每攒够这么多条或隔这么久推送一次
+PREVIEW_BATCH_SIZE = 50
+PREVIEW_BATCH_INTERVAL = 0.2
+
+def _iter_pages(entries):
+    """逐页读取 yt-dlp 的分页列表，用到下一页时才请求，不在开始时取完所有页"""
+    page_size = getattr(entries, '_pagesize', None) or PREVIEW_BATCH_SIZE
+    start = 0
+    while True:
+        page = entries.getslice(start, start + page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        start += page_size
+
+class PlaylistPreviewWorker(Task):
+    """只读取播放列表的标题和时长（不解析各分P的格式），分批推送给界面"""
+    lane = LANE_INTERACTIVE
+    items_found = pyqtSignal(list)          # [(序号, 标题, 时长秒数或 None)]
+    finished_signal = pyqtSignal(str, int)  # 播放列表标题和条目数
+    error_signal = pyqtSignal(str)          # 错误信息
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+
+    def run(self):
+        if not yt_dlp:
+            self.error_signal.emit("未安装 yt-dlp，无法读取列表\n请使用 pip install yt-dlp 安装")
+            return
+        opts = {'quiet': True, 'nocheckcertificate': True, 'extract_flat': 'in_playlist',
+                'lazy_playlist': True}
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                # process=False 时条目是惰性的，边取边推送，不等整个列表
+                info = ydl.extract_info(self.url, download=False, process=False)
+                if info.get('_type') in ('url', 'url_transparent'):
+                    info = ydl.extract_info(self.url, download=False)
+                count = self._stream_entries(info)
+        except Exception as e:
+            if not self.is_canceled:
+                self.error_signal.emit(f"读取列表失败: {str(e)}")
+            return
+        if not self.is_canceled:
+            self.finished_signal.emit(info.get('title') or "", count)
+
+    def _stream_entries(self, info):
+        entries = info.get('entries')
+        if entries is None:
+            self.items_found.emit([(1, info.get('title') or self.url, info.get('duration'))])
+            return 1
+        if hasattr(entries, 'getslice'):
+            entries = _iter_pages(entries)  # 分页列表
+        batch = []
+        count = 0
+        last_emit = time.monotonic()
+        for entry in entries:
+            if self.is_canceled:
+                return count
+            count += 1
+            entry = entry or {}
+            batch.append((count, entry.get('title') or f"P{count}", entry.get('duration')))
+            now = time.monotonic()
+            if len(batch) >= PREVIEW_BATCH_SIZE or now - last_emit >= PREVIEW_BATCH_INTERVAL:
+                self.items_found.emit(batch)
+                batch = []
+                last_emit = now
+        if batch:
+            self.items_found.emit(batch)
+        return count
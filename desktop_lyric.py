@@ -1,9 +1,21 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QMenu, QColorDialog, QFontDialog
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QColor, QGraphicsDropShadowEffect
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QWidget, QMenu, QColorDialog, QFontDialog, QApplication
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QFont, QColor, QPainter, QPainterPath, QPixmap, QPen, QFontMetricsF
 
 from ui_scale_manager import UIScaleManager
 
+# 描边宽度（像素），代替逐帧模糊的阴影效果
+OUTLINE_WIDTH = 3
+# 渲染好的行缓存数量（当前三行 + 预渲染的下一行 + 逐字高亮的两种状态，留一些余量给来回切换）
+LINE_CACHE_SIZE = 16
+
+# 行样式
+STYLE_CURRENT = 'current'   # 当前行
+STYLE_SIDE = 'side'         # 上下两行
+STYLE_PENDING = 'pending'   # 逐字歌词中尚未唱到的部分
+
 class DesktopLyricWindow(QWidget):
     def __init__(self, scale_manager=None):
         super().__init__()
@@ -26,41 +38,160 @@ class DesktopLyricWindow(QWidget):
         self.font = QFont("Segoe UI", base_font_size + 22, QFont.Bold)
         self.locked = False
 
-        layout = QVBoxLayout(self)
-        self.labels = [QLabel("") for _ in range(3)]
+        # 三行文本：上一行、当前行、下一行；渲染结果按 (文本, 行样式, 缩放比) 缓存为位图
+        self.texts = ["", "", ""]
+        self._line_cache = OrderedDict()
 
-        for label in self.labels:
-            label.setAlignment(Qt.AlignCenter)
-            layout.addWidget(label)
+        # 逐字高亮：当前行的 LineWords、每个字右边缘的横坐标、已唱部分的宽度
+        self.words = None
+        self._word_edges = None
+        self._sweep_x = 0.0
 
         self.update_style()
         self.move(100, 800)
 
     def update_style(self):
-        shadow_color = QColor(0, 0, 0, 100)
-
-        for i, label in enumerate(self.labels):
-            effect = QGraphicsDropShadowEffect()
-            effect.setBlurRadius(12)
-            effect.setColor(shadow_color)
-            effect.setOffset(0, 0)
-            label.setGraphicsEffect(effect)
-
-            font = QFont(self.font)
-            if i == 1:  # 当前歌词
-                font_size = self.font.pointSize()
-            else:  # 上下歌词
-                font_size = int(self.font.pointSize() * 0.6)
-            font.setPointSize(font_size)
-
-            color = self.color.name() if i == 1 else f"rgba({self.color.red()},{self.color.green()},{self.color.blue()},100)"
-            label.setStyleSheet(f"color: {color}")
-            label.setFont(font)
-
-    def set_text(self, prev, current, next_):
-        self.labels[0].setText(prev)
-        self.labels[1].setText(current)
-        self.labels[2].setText(next_)
+        """字体或颜色变化：丢弃所有缓存位图"""
+        self._line_cache.clear()
+        self._word_edges = None
+        self.update()
+
+    # -- 行样式与渲染缓存 --
+    def _line_style(self, style):
+        font = QFont(self.font)
+        color = QColor(self.color)
+        if style == STYLE_SIDE:  # 上下歌词
+            font.setPointSize(max(1, int(self.font.pointSize() * 0.6)))
+            color.setAlpha(100)
+        elif style == STYLE_PENDING:
+            color.setAlpha(130)
+        return font, color
+
+    def _render_line(self, text, style):
+        ratio = self.devicePixelRatioF()
+        key = (text, style, ratio)
+        pixmap = self._line_cache.get(key)
+        if pixmap is not None:
+            self._line_cache.move_to_end(key)
+            return pixmap
+
+        font, color = self._line_style(style)
+        metrics = QFontMetricsF(font)
+        margin = OUTLINE_WIDTH + 1
+        width = metrics.horizontalAdvance(text) + margin * 2
+        height = metrics.height() + margin * 2
+
+        pixmap = QPixmap(max(1, int(width * ratio)), max(1, int(height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        path = QPainterPath()
+        path.addText(QPointF(margin, margin + metrics.ascent()), font, text)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        outline = QColor(0, 0, 0, 60 if style == STYLE_SIDE else 100)
+        painter.strokePath(path, QPen(outline, OUTLINE_WIDTH, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        painter.fillPath(path, color)
+        painter.end()
+
+        self._line_cache[key] = pixmap
+        while len(self._line_cache) > LINE_CACHE_SIZE:
+            self._line_cache.popitem(last=False)
+        return pixmap
+
+    def _row_rects(self):
+        # 当前行占一半高度，上下两行各占四分之一
+        w, h = self.width(), self.height()
+        small = h / 4
+        return [QRectF(0, 0, w, small), QRectF(0, small, w, h / 2), QRectF(0, small + h / 2, w, small)]
+
+    def set_text(self, prev, current, next_, words=None):
+        texts = [prev, current, next_]
+        if texts == self.texts and words is self.words:
+            return
+        self.texts = texts
+        self.words = words
+        self._word_edges = None
+        self._sweep_x = 0.0
+        # 提前渲染下一行的“当前行”样式，切换时直接贴图
+        if next_:
+            self._render_line(next_, STYLE_CURRENT)
+        self.update()
+
+    # -- 逐字高亮 --
+    def _edges(self):
+        if self._word_edges is None and self.words:
+            font, _ = self._line_style(STYLE_CURRENT)
+            metrics = QFontMetricsF(font)
+            edges = []
+            prefix = ""
+            for text in self.words.texts:
+                prefix += text
+                edges.append(metrics.horizontalAdvance(prefix))
+            self._word_edges = edges
+        return self._word_edges
+
+    def set_progress(self, position_ms):
+        """更新逐字高亮位置，只重绘高亮前沿扫过的那一小块区域"""
+        edges = self._edges()
+        if not edges:
+            return
+        done, fraction = self.words.progress_at(position_ms)
+        left = edges[done - 1] if done > 0 else 0.0
+        x = left
+        if done < len(edges):
+            x += (edges[done] - left) * fraction
+        if abs(x - self._sweep_x) < 0.5:
+            return
+
+        old_x, self._sweep_x = self._sweep_x, x
+        origin = self._line_origin(1)
+        if origin is None:
+            return
+        margin = OUTLINE_WIDTH + 1
+        pixmap = self._render_line(self.texts[1], STYLE_CURRENT)
+        height = pixmap.height() / pixmap.devicePixelRatio()
+        dirty = QRectF(origin.x() + margin + min(old_x, x) - margin, origin.y(),
+                       abs(x - old_x) + margin * 2, height)
+        self.update(dirty.toAlignedRect())
+
+    def _line_origin(self, row):
+        text = self.texts[row]
+        if not text:
+            return None
+        style = STYLE_CURRENT if row == 1 else STYLE_SIDE
+        pixmap = self._render_line(text, style)
+        size = pixmap.size() / pixmap.devicePixelRatio()
+        rect = self._row_rects()[row]
+        return QPointF(rect.x() + (rect.width() - size.width()) / 2,
+                       rect.y() + (rect.height() - size.height()) / 2)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        for row in range(3):
+            origin = self._line_origin(row)
+            if origin is None:
+                continue
+            text = self.texts[row]
+            if row != 1:
+                painter.drawPixmap(origin, self._render_line(text, STYLE_SIDE))
+            elif not self.words:
+                painter.drawPixmap(origin, self._render_line(text, STYLE_CURRENT))
+            else:
+                # 逐字歌词：先画未唱部分，再按已唱宽度裁剪画高亮部分
+                sung = self._render_line(text, STYLE_CURRENT)
+                painter.drawPixmap(origin, self._render_line(text, STYLE_PENDING))
+                height = sung.height() / sung.devicePixelRatio()
+                painter.save()
+                painter.setClipRect(QRectF(origin.x(), origin.y(),
+                                           OUTLINE_WIDTH + 1 + self._sweep_x, height))
+                painter.drawPixmap(origin, sung)
+                painter.restore()
+        painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update()
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -1,23 +1,33 @@
+import os
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, 
                            QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
                            QLabel, QMessageBox, QGroupBox, QRadioButton, QComboBox,
                            QTabWidget, QWidget, QSlider, QApplication, QColorDialog,
                            QFontDialog, QInputDialog, QFileDialog, QCheckBox, QSpinBox,
-                           QProgressBar, QGridLayout)
-from PyQt5.QtCore import Qt, QUrl
+                           QProgressBar, QGridLayout, QPlainTextEdit, QListView)
+from PyQt5.QtCore import Qt, QUrl, QAbstractListModel, QModelIndex
 from PyQt5.QtGui import QColor, QFont, QDesktopServices
 
 from ui_scale_manager import UIScaleManager
 from theme_manager import ThemeManager
 from style_generator import generate_stylesheet
 from utils import ICONS, LyricListSearchWorker, LyricDownloader
-from bilibili_downloader import BilibiliDownloader
+from lyric_store import get_lyric_store
+from match_ranker import DEFAULT_THRESHOLD, rank_candidates
+from bilibili_downloader import BilibiliDownloader, PlaylistPreviewWorker, OUTPUT_FORMATS, FORMAT_VIDEO
+from download_manager import JOB_DONE
+from download_progress import format_speed, format_eta
 
 # -- 对话框类 --  
 class LyricSearchDialog(QDialog):  
-    def __init__(self, song_name, duration_ms=0, parent=None):  
+    def __init__(self, song_name, duration_ms=0, parent=None, lrc_path=None, track=None):  
         super().__init__(parent)  
         self.setWindowTitle("搜索歌词")  
+        # 指定 lrc_path 时，确认后直接把选中的歌词绑定到该文件
+        self.lrc_path = lrc_path
+        # 当前歌曲（歌名、歌手、时长），结果按它打分；没有时按搜索框中的文字打分
+        self.track = track
+        self.downloader = None
 
         # 获取屏幕尺寸和缩放管理器  
         screen = QApplication.primaryScreen()  
@@ -31,7 +41,9 @@ class LyricSearchDialog(QDialog):
         self.resize(dialog_width, dialog_height)
 
         self.result_id = None
-        self.duration_ms = duration_ms
+        self.duration_ms = duration_ms or (track or {}).get('duration') or 0
+        self.worker = None
+        self._workers = []
 
         theme = self.theme_manager.get_theme()
         self.setStyleSheet(generate_stylesheet(theme, self.scale_manager, screen_size.width(), screen_size.height()))
@@ -59,8 +71,8 @@ class LyricSearchDialog(QDialog):
 
         # 结果表格
         self.result_table = QTableWidget()
-        self.result_table.setColumnCount(4)
-        self.result_table.setHorizontalHeaderLabels(['歌名', "歌手", "时长", "ID"])
+        self.result_table.setColumnCount(5)
+        self.result_table.setHorizontalHeaderLabels(['歌名', "歌手", "时长", "ID", "匹配度"])
         self.result_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.result_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.result_table.itemDoubleClicked.connect(self.on_item_double_click)
@@ -87,15 +99,29 @@ class LyricSearchDialog(QDialog):
         self.result_table.setRowCount(0)
         self.status_label.setText("搜索中...")
 
-        self.worker = LyricListSearchWorker(keyword)
-        self.worker.search_finished.connect(self.on_search_finished)
-        self.worker.start()
+        # 上一次搜索还没返回时丢弃它的结果
+        if self.worker:
+            self.worker.cancel()
+        worker = LyricListSearchWorker(keyword)
+        worker.search_finished.connect(self.on_search_finished)
+        # 被取消的搜索在返回前仍保留引用，结束后再释放
+        worker.finished.connect(lambda w=worker: self._workers.remove(w))
+        worker.finished.connect(worker.deleteLater)
+        self._workers.append(worker)
+        self.worker = worker
+        worker.start()
 
     def on_search_finished(self, results):
         self.status_label.setText(f"找到 {len(results)} 条")
         self.result_table.setRowCount(len(results))
 
-        for i, result in enumerate(results):
+        # 按匹配度排序，达到自动匹配阈值的结果标绿
+        if self.track:
+            query = {'name': self.track.get('name'), 'artist': self.track.get('artist'),
+                     'duration': self.duration_ms}
+        else:
+            query = {'name': self.search_input.text(), 'duration': self.duration_ms}
+        for i, (result, score) in enumerate(rank_candidates(query, results)):
             self.result_table.setItem(i, 0, QTableWidgetItem(result['name']))
             self.result_table.setItem(i, 1, QTableWidgetItem(result['artist']))
 
@@ -105,18 +131,35 @@ class LyricSearchDialog(QDialog):
             self.result_table.setItem(i, 2, duration_item)
             self.result_table.setItem(i, 3, QTableWidgetItem(str(result['id'])))
 
+            score_item = QTableWidgetItem(f"{score:.0%}")
+            if score >= DEFAULT_THRESHOLD:
+                score_item.setForeground(QColor("#1ECD97"))
+            self.result_table.setItem(i, 4, score_item)
+        if results:
+            self.result_table.selectRow(0)
+
     def on_item_double_click(self, item):
         self.result_id = self.result_table.item(item.row(), 3).text()
+        self.bind_result()
         self.accept()
 
     def confirm_bind(self):
         row = self.result_table.currentRow()
         if row >= 0:
             self.result_id = self.result_table.item(row, 3).text()
+            self.bind_result()
             self.accept()
         else:
             QMessageBox.warning(self, "提示", "请选择一首歌曲")
 
+    def bind_result(self):
+        """绑定歌词：仓库里已有这首歌时直接链接过去，否则后台下载"""
+        if not self.lrc_path or not self.result_id:
+            return
+        if get_lyric_store().bind(self.result_id, self.lrc_path) is None:
+            self.downloader = LyricDownloader(self.result_id, self.lrc_path)
+            self.downloader.start()
+
 class BatchInfoDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -198,10 +241,79 @@ class BatchInfoDialog(QDialog):
         self.year_input.setText(year)
 
 
-class BilibiliDownloadDialog(QDialog):
+# --- 播放列表预览：可勾选的分P列表，条目分批追加 ---
+class PlaylistItemsModel(QAbstractListModel):
     def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []   # [序号, 标题, 时长秒数, 是否选中]
+        self._checked = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        number, title, duration, checked = self._items[index.row()]
+        if role == Qt.DisplayRole:
+            return f"P{number}  {title}  [{format_eta(duration)}]" if duration else f"P{number}  {title}"
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if checked else Qt.Unchecked
+        if role == Qt.ToolTipRole:
+            return title
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        item = self._items[index.row()]
+        checked = value == Qt.Checked
+        if item[3] != checked:
+            item[3] = checked
+            self._checked += 1 if checked else -1
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def append_items(self, items):
+        if not items:
+            return
+        first = len(self._items)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self._items.extend([number, title, duration, True] for number, title, duration in items)
+        self._checked += len(items)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._items = []
+        self._checked = 0
+        self.endResetModel()
+
+    def set_all_checked(self, checked):
+        if not self._items:
+            return
+        for item in self._items:
+            item[3] = checked
+        self._checked = len(self._items) if checked else 0
+        self.dataChanged.emit(self.index(0), self.index(len(self._items) - 1), [Qt.CheckStateRole])
+
+    def checked_count(self):
+        return self._checked
+
+    def checked_numbers(self):
+        return [item[0] for item in self._items if item[3]]
+
+
+class BilibiliDownloadDialog(QDialog):
+    def __init__(self, parent=None, manager=None):
         super().__init__(parent)
         self.setWindowTitle("B站音频下载")
+        # 有下载管理器时任务加入队列，对话框可以继续添加下一个
+        self.manager = manager or getattr(parent, 'download_manager', None)
+        self.job_id = None
         
         # 获取屏幕尺寸和缩放管理器
         screen = QApplication.primaryScreen()
@@ -211,7 +323,7 @@ class BilibiliDownloadDialog(QDialog):
 
         # 设置对话框尺寸
         dialog_width = self.scale_manager.get_scaled_size(screen_size.width(), screen_size.height(), 600)
-        dialog_height = self.scale_manager.get_scaled_size(screen_size.width(), screen_size.height(), 500)
+        dialog_height = self.scale_manager.get_scaled_size(screen_size.width(), screen_size.height(), 650)
         self.resize(dialog_width, dialog_height)
 
         theme = self.theme_manager.get_theme()
@@ -228,10 +340,38 @@ class BilibiliDownloadDialog(QDialog):
         url_label = QLabel("视频链接:")
         self.url_input = QLineEdit()
         self.url_input.setPlaceholderText("输入B站视频或 playlist 链接")
+        self.url_input.textChanged.connect(self.clear_playlist)
+        self.load_btn = QPushButton("读取列表")
+        self.load_btn.clicked.connect(self.load_playlist)
         url_layout.addWidget(url_label)
         url_layout.addWidget(self.url_input)
+        url_layout.addWidget(self.load_btn)
         main_layout.addLayout(url_layout)
 
+        # 分P列表：读取后勾选要下载的分P，代替手动填写范围
+        self.playlist_model = PlaylistItemsModel(self)
+        self.playlist_model.rowsInserted.connect(self.update_selection_label)
+        self.playlist_model.dataChanged.connect(self.update_selection_label)
+        self.playlist_model.modelReset.connect(self.update_selection_label)
+        self.playlist_view = QListView()
+        self.playlist_view.setModel(self.playlist_model)
+        # 行高一致时 Qt 不用逐行计算尺寸，几百上千条也能快速滚动
+        self.playlist_view.setUniformItemSizes(True)
+        self.playlist_view.setLayoutMode(QListView.Batched)
+        main_layout.addWidget(self.playlist_view, 1)
+
+        selection_layout = QHBoxLayout()
+        self.selection_label = QLabel("")
+        self.select_all_btn = QPushButton("全选")
+        self.select_all_btn.clicked.connect(lambda: self.playlist_model.set_all_checked(True))
+        self.select_none_btn = QPushButton("全不选")
+        self.select_none_btn.clicked.connect(lambda: self.playlist_model.set_all_checked(False))
+        selection_layout.addWidget(self.selection_label, 1)
+        selection_layout.addWidget(self.select_all_btn)
+        selection_layout.addWidget(self.select_none_btn)
+        main_layout.addLayout(selection_layout)
+        self.preview_worker = None
+
         # 下载设置
         settings_group = QGroupBox("下载设置")
         settings_layout = QGridLayout(settings_group)
@@ -262,8 +402,17 @@ class BilibiliDownloadDialog(QDialog):
         # 格式选择
         format_label = QLabel("格式:")
         self.format_combo = QComboBox()
-        self.format_combo.addItems(["仅音频 (MP3)", "视频 (MP4)"])
-        self.format_combo.setCurrentIndex(0)
+        for value, text in OUTPUT_FORMATS:
+            self.format_combo.addItem(text, value)
+        self.format_combo.setCurrentIndex(0)  # 默认仅下载音频流并封装为 m4a
+        self.format_combo.currentIndexChanged.connect(self.update_split_options)
+
+        # 章节分割：长视频按章节或时间轴切成单曲
+        self.split_check = QCheckBox("按章节分割为单曲")
+        self.split_check.toggled.connect(self.update_split_options)
+        self.cue_input = QPlainTextEdit()
+        self.cue_input.setPlaceholderText("可选：粘贴时间轴或 CUE（仅单个视频），例如\n00:00 开场\n03:25 歌名 - 歌手\n留空则使用视频自带的章节")
+        self.cue_input.setMaximumHeight(self.scale_manager.get_scaled_size(screen_size.width(), screen_size.height(), 90))
 
         # 添加到布局
         settings_layout.addWidget(mode_label, 0, 0)
@@ -281,6 +430,10 @@ class BilibiliDownloadDialog(QDialog):
         
         settings_layout.addWidget(format_label, 3, 0)
         settings_layout.addWidget(self.format_combo, 3, 1)
+        settings_layout.addWidget(self.split_check, 3, 2, 1, 3)
+        settings_layout.addWidget(self.cue_input, 4, 1, 1, 4)
+        self.update_split_options()
+        self.update_selection_label()
         
         main_layout.addWidget(settings_group)
 
@@ -312,6 +465,78 @@ class BilibiliDownloadDialog(QDialog):
 
         # 下载线程
         self.downloader = None
+        if self.manager is not None:
+            self.manager.job_changed.connect(self.on_job_changed)
+
+    # -- 播放列表预览 --
+    def load_playlist(self):
+        url = self.url_input.text().strip()
+        if not url:
+            QMessageBox.warning(self, "错误", "请输入视频链接")
+            return
+        self.clear_playlist()
+        self.playlist_radio.setChecked(True)
+        self.selection_label.setText("正在读取列表...")
+        self.load_btn.setEnabled(False)
+        worker = PlaylistPreviewWorker(url)
+        worker.items_found.connect(lambda items, w=worker: self.playlist_items_found(w, items))
+        worker.finished_signal.connect(lambda title, count, w=worker: self.playlist_loaded(w, title, count))
+        worker.error_signal.connect(lambda msg, w=worker: self.playlist_failed(w, msg))
+        self.preview_worker = worker
+        worker.start()
+
+    def playlist_items_found(self, worker, items):
+        # 取消的旧任务可能还有已排队的批次，丢弃，避免混进新列表
+        if worker is not self.preview_worker:
+            return
+        self.playlist_model.append_items(items)
+
+    def playlist_loaded(self, worker, title, count):
+        if worker is not self.preview_worker:
+            return
+        self.preview_worker = None
+        self.load_btn.setEnabled(True)
+        if count:
+            self.start_spin.setValue(1)
+            self.end_spin.setMaximum(max(count, self.end_spin.maximum()))
+            self.end_spin.setValue(count)
+        self.update_selection_label()
+
+    def playlist_failed(self, worker, error_msg):
+        if worker is not self.preview_worker:
+            return
+        self.preview_worker = None
+        self.load_btn.setEnabled(True)
+        self.selection_label.setText(error_msg)
+
+    def clear_playlist(self):
+        # 链接变化后旧列表作废
+        if self.preview_worker is not None:
+            self.preview_worker.cancel()
+            self.preview_worker = None
+            self.load_btn.setEnabled(True)
+        if self.playlist_model.rowCount():
+            self.playlist_model.clear()
+
+    def update_selection_label(self, *args):
+        total = self.playlist_model.rowCount()
+        loaded = total > 0
+        # 有列表时按勾选下载，范围输入不再使用
+        self.start_spin.setEnabled(not loaded)
+        self.end_spin.setEnabled(not loaded)
+        self.select_all_btn.setEnabled(loaded)
+        self.select_none_btn.setEnabled(loaded)
+        if loaded:
+            suffix = "（读取中）" if self.preview_worker is not None else ""
+            self.selection_label.setText(f"已选 {self.playlist_model.checked_count()} / {total} 个分P{suffix}")
+        elif self.preview_worker is None:
+            self.selection_label.setText("点击“读取列表”可以勾选要下载的分P")
+
+    def update_split_options(self):
+        # 视频格式不分割
+        audio = self.format_combo.currentData() != FORMAT_VIDEO
+        self.split_check.setEnabled(audio)
+        self.cue_input.setEnabled(audio and self.split_check.isChecked())
 
     def browse_path(self):
         path = QFileDialog.getExistingDirectory(self, "选择保存目录", self.path_input.text())
@@ -334,6 +559,24 @@ class BilibiliDownloadDialog(QDialog):
         mode = 'single' if self.single_radio.isChecked() else 'playlist'
         start = self.start_spin.value()
         end = self.end_spin.value() if mode == 'playlist' else None
+        items = None
+        if mode == 'playlist' and self.playlist_model.rowCount():
+            items = self.playlist_model.checked_numbers()
+            if not items:
+                QMessageBox.warning(self, "错误", "请至少勾选一个分P")
+                return
+            start, end = items[0], items[-1]
+        output_format = self.format_combo.currentData()
+        split_tracks = self.split_check.isEnabled() and self.split_check.isChecked()
+        cue_text = self.cue_input.toPlainText().strip() if split_tracks else ""
+
+        if self.manager is not None:
+            self.job_id = self.manager.add(url, path, mode, start, end, output_format, split_tracks, cue_text,
+                                           items)
+            self.progress_bar.setValue(0)
+            self.status_label.setText("已加入下载队列")
+            self.url_input.clear()
+            return
         
         # 禁用控件
         self.start_btn.setEnabled(False)
@@ -344,6 +587,7 @@ class BilibiliDownloadDialog(QDialog):
         self.playlist_radio.setEnabled(False)
         self.start_spin.setEnabled(False)
         self.end_spin.setEnabled(False)
+        self.load_btn.setEnabled(False)
 
         # 开始下载
         self.downloader = BilibiliDownloader(
@@ -351,7 +595,11 @@ class BilibiliDownloadDialog(QDialog):
             path=path,
             mode=mode,
             start=start,
-            end=end
+            end=end,
+            output_format=output_format,
+            split_tracks=split_tracks,
+            cue_text=cue_text or None,
+            items=items
         )
         
         self.downloader.progress_signal.connect(self.update_progress)
@@ -359,9 +607,11 @@ class BilibiliDownloadDialog(QDialog):
         self.downloader.error_signal.connect(self.download_error)
         self.downloader.start()
 
-    def update_progress(self, text, percent):
-        self.status_label.setText(text)
-        self.progress_bar.setValue(percent)
+    def update_progress(self, progress):
+        self.status_label.setText(f"正在下载: {progress.summary}  {format_speed(progress.speed)}  "
+                                  f"剩余 {format_eta(progress.eta)}"
+                                  + (f"  后处理 {progress.processing_summary}" if progress.processing_total else ""))
+        self.progress_bar.setValue(progress.percent)
 
     def download_finished(self, path, filename):
         self.status_label.setText("下载完成!")
@@ -375,7 +625,25 @@ class BilibiliDownloadDialog(QDialog):
         self._restore_ui()
         QMessageBox.critical(self, "下载失败", error_msg)
 
+    def on_job_changed(self, job_id):
+        job = self.manager.job(job_id)
+        if job_id != self.job_id or job is None:
+            return
+        text = f"{job.status_text}: {job.message}" if job.message else job.status_text
+        if job.progress is not None:
+            text += f"  {format_speed(job.progress.speed)}  剩余 {format_eta(job.progress.eta)}"
+            if job.progress.processing_total:
+                text += f"  后处理 {job.progress.processing_summary}"
+        self.status_label.setText(text)
+        self.progress_bar.setValue(job.percent)
+        if job.status == JOB_DONE:
+            self.open_folder_btn.setEnabled(True)
+
     def cancel_download(self):
+        job = self.manager.job(self.job_id) if self.manager is not None else None
+        if job is not None and job.is_active:
+            self.manager.cancel(self.job_id)
+            return
         if self.downloader and self.downloader.isRunning():
             self.downloader.cancel_download()
             self.status_label.setText("正在取消...")
@@ -395,5 +663,5 @@ class BilibiliDownloadDialog(QDialog):
         self.browse_btn.setEnabled(True)
         self.single_radio.setEnabled(True)
         self.playlist_radio.setEnabled(True)
-        self.start_spin.setEnabled(True)
-        self.end_spin.setEnabled(True)
+        self.load_btn.setEnabled(True)
+        self.update_selection_label()
@@ -0,0 +1,111 @@
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+
+from utils import get_app_data_dir
+
+_BV_RE = re.compile(r'(BV[0-9A-Za-z]{10})')
+_AV_RE = re.compile(r'\bav(\d+)', re.IGNORECASE)
+_PART_RE = re.compile(r'[?&]p=(\d+)')
+
+# -- 链接解析（不访问网络） --
+def parse_video_id(url):
+    """从链接中取出 BV 号或 av 号，取不到时返回 None"""
+    match = _BV_RE.search(url or "")
+    if match:
+        return match.group(1)
+    match = _AV_RE.search(url or "")
+    return f"av{match.group(1)}" if match else None
+
+def parse_part(url):
+    """链接中的分P序号（?p=N），没有时返回 None"""
+    match = _PART_RE.search(url or "")
+    return int(match.group(1)) if match else None
+
+def archive_key(video_id, variant=None):
+    """档案中的视频键；同一视频的不同输出格式（如 mp3、视频）分开记录"""
+    if not video_id:
+        return None
+    return f"{video_id}:{variant}" if variant else video_id
+
+def file_sha1(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- 下载档案：记录 (视频 ID, 分P) 对应的本地文件，重复下载前先查这里 ---
+class DownloadArchive:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_app_data_dir(), "download_archive.db")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                video_id TEXT NOT NULL,
+                part INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                sha1 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (video_id, part)
+            );
+            DROP INDEX IF EXISTS idx_items_sha1;
+        """)
+        self._db.commit()
+
+    def lookup(self, video_id, part=1):
+        """已下载且文件仍在（大小未变）时返回文件路径，否则返回 None"""
+        with self._lock:
+            row = self._db.execute("SELECT path, size FROM items WHERE video_id = ? AND part = ?",
+                                   (video_id, part)).fetchone()
+        if row is None:
+            return None
+        path, size = row
+        try:
+            if os.path.getsize(path) == size:
+                return path
+        except OSError:
+            pass
+        # 文件被删除或改动过，档案记录作废
+        self.forget(video_id, part)
+        return None
+
+    def missing_parts(self, video_id, parts):
+        """parts 中还没有下载过的分P"""
+        return [part for part in parts if self.lookup(video_id, part) is None]
+
+    def record(self, video_id, part, path):
+        """下载完成后登记（在工作线程中计算文件哈希）"""
+        sha1 = file_sha1(path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._db.execute("""
+                INSERT OR REPLACE INTO items (video_id, part, path, sha1, size, added_at)
+                VALUES (?, ?, ?, ?, ?, ?)""", (video_id, part, os.path.abspath(path), sha1, size, time.time()))
+            self._db.commit()
+        return sha1
+
+    def forget(self, video_id, part):
+        with self._lock:
+            self._db.execute("DELETE FROM items WHERE video_id = ? AND part = ?", (video_id, part))
+            self._db.commit()
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_download_archive():
+    """全局共享的下载档案"""
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = DownloadArchive()
+    return _archive
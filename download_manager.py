@@ -0,0 +1,324 @@
+import os
+import time
+import sqlite3
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils import get_app_data_dir
+from bilibili_downloader import BilibiliDownloader, FORMAT_M4A
+from task_executor import get_executor, LANE_DOWNLOAD
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_PAUSED = 'paused'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELED = 'canceled'
+
+JOB_STATUS_TEXT = {
+    JOB_QUEUED: "等待中",
+    JOB_RUNNING: "下载中",
+    JOB_PAUSED: "已暂停",
+    JOB_DONE: "已完成",
+    JOB_FAILED: "失败",
+    JOB_CANCELED: "已取消",
+}
+
+DEFAULT_MAX_CONCURRENT = 2
+
+
+# --- 下载任务记录 ---
+class DownloadJob:
+    __slots__ = ('id', 'url', 'path', 'mode', 'start', 'end', 'status',
+                 'percent', 'message', 'created_at', 'part_files', 'output_format',
+                 'split_tracks', 'cue_text', 'items', 'progress')
+
+    def __init__(self, id, url, path, mode='single', start=1, end=None, status=JOB_QUEUED,
+                 percent=0, message="", created_at=None, part_files="", output_format=FORMAT_M4A,
+                 split_tracks=False, cue_text="", items=""):
+        self.id = id
+        self.url = url
+        self.path = path
+        self.mode = mode
+        self.start = start
+        self.end = end
+        self.status = status
+        self.percent = percent
+        self.message = message
+        self.created_at = created_at or time.time()
+        # 正在下载的目标文件名，取消任务时删除对应的 .part/.ytdl 临时文件
+        self.part_files = set(filter(None, part_files.split("\n")))
+        self.output_format = output_format
+        # 按章节（或用户提供的时间轴）分割为单曲
+        self.split_tracks = bool(split_tracks)
+        self.cue_text = cue_text or ""
+        # 播放列表中选中的分P序号（数据库中以逗号分隔保存），为空时按 start-end 范围下载
+        self.items = [int(n) for n in items.split(",") if n] if isinstance(items, str) else list(items or [])
+        # 最近一次的 DownloadProgress（速度、剩余时间等），只在运行期间有意义
+        self.progress = None
+
+    @property
+    def is_active(self):
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    @property
+    def status_text(self):
+        return JOB_STATUS_TEXT.get(self.status, self.status)
+
+
+# --- 下载队列管理：队列保存在 SQLite 中，重启后继续；同时最多运行 max_concurrent 个任务 ---
+class DownloadManager(QObject):
+    job_added = pyqtSignal(int)    # 任务 ID
+    job_changed = pyqtSignal(int)  # 任务 ID（状态或进度变化）
+    job_removed = pyqtSignal(int)  # 任务 ID
+
+    def __init__(self, db_path=None, max_concurrent=DEFAULT_MAX_CONCURRENT, parent=None, worker_host=None):
+        super().__init__(parent)
+        # 有 worker_host 时下载在独立的工作进程中运行，否则在主进程的线程池中运行
+        self.worker_host = worker_host
+        self.db_path = db_path or os.path.join(get_app_data_dir(), "downloads.db")
+        self.max_concurrent = max_concurrent
+        self._jobs = {}
+        self._workers = {}   # 任务 ID -> 正在运行的 BilibiliDownloader
+        self._stopping = {}  # 任务 ID -> 已要求停止、线程尚未退出的 BilibiliDownloader
+        self._closing = False
+        self._db = sqlite3.connect(self.db_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                path TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER,
+                status TEXT NOT NULL,
+                percent INTEGER NOT NULL DEFAULT 0,
+                message TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                part_files TEXT NOT NULL DEFAULT '',
+                output_format TEXT NOT NULL DEFAULT 'm4a',
+                split_tracks INTEGER NOT NULL DEFAULT 0,
+                cue_text TEXT NOT NULL DEFAULT '',
+                items TEXT NOT NULL DEFAULT ''
+            )""")
+        # 旧版本创建的表缺少后来加入的列
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, definition in (('output_format', "TEXT NOT NULL DEFAULT 'm4a'"),
+                                 ('split_tracks', "INTEGER NOT NULL DEFAULT 0"),
+                                 ('cue_text', "TEXT NOT NULL DEFAULT ''"),
+                                 ('items', "TEXT NOT NULL DEFAULT ''")):
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+        self._db.commit()
+        get_executor().set_lane_limit(LANE_DOWNLOAD, max_concurrent)
+        self._load()
+
+    def _load(self):
+        rows = self._db.execute("""
+            SELECT id, url, path, mode, start, end, status, percent, message, created_at,
+                   part_files, output_format, split_tracks, cue_text, items
+            FROM jobs ORDER BY id""").fetchall()
+        for row in rows:
+            job = DownloadJob(*row)
+            # 上次退出时还在下载的任务重新排队，已下载的部分由 .part 文件续传
+            if job.status == JOB_RUNNING:
+                job.status = JOB_QUEUED
+            self._jobs[job.id] = job
+
+    def _save(self, job):
+        self._db.execute("""
+            UPDATE jobs SET status = ?, percent = ?, message = ?, part_files = ? WHERE id = ?""",
+            (job.status, job.percent, job.message, "\n".join(sorted(job.part_files)), job.id))
+        self._db.commit()
+
+    # -- 查询 --
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def running_count(self):
+        return len(self._workers)
+
+    # -- 操作 --
+    def add(self, url, path, mode='single', start=1, end=None, output_format=FORMAT_M4A,
+            split_tracks=False, cue_text="", items=None):
+        created_at = time.time()
+        cursor = self._db.execute("""
+            INSERT INTO jobs (url, path, mode, start, end, status, created_at, output_format,
+                              split_tracks, cue_text, items)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (url, path, mode, start, end, JOB_QUEUED, created_at, output_format,
+             int(bool(split_tracks)), cue_text or "", ",".join(str(n) for n in items or [])))
+        self._db.commit()
+        job = DownloadJob(cursor.lastrowid, url, path, mode, start, end, created_at=created_at,
+                          output_format=output_format, split_tracks=split_tracks, cue_text=cue_text,
+                          items=items)
+        self._jobs[job.id] = job
+        self.job_added.emit(job.id)
+        self._schedule()
+        return job.id
+
+    def pause(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or not job.is_active:
+            return
+        self._set_status(job, JOB_PAUSED, "已暂停")
+        self._stop_worker(job_id)
+
+    def resume(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in (JOB_PAUSED, JOB_FAILED, JOB_CANCELED):
+            return
+        self._set_status(job, JOB_QUEUED, "")
+        self._schedule()
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or job.status in (JOB_DONE, JOB_CANCELED):
+            return
+        running = job_id in self._workers or job_id in self._stopping
+        self._set_status(job, JOB_CANCELED, "已取消")
+        if running:
+            # 线程退出后再删除临时文件
+            self._stop_worker(job_id)
+        else:
+            self._remove_part_files(job)
+
+    def remove(self, job_id):
+        if job_id not in self._jobs:
+            return
+        self.cancel(job_id)
+        del self._jobs[job_id]
+        self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._db.commit()
+        self.job_removed.emit(job_id)
+
+    def clear_finished(self):
+        for job in self.jobs():
+            if job.status == JOB_DONE:
+                self.remove(job.id)
+
+    def set_max_concurrent(self, count):
+        self.max_concurrent = max(1, count)
+        get_executor().set_lane_limit(LANE_DOWNLOAD, self.max_concurrent)
+        self._schedule()
+
+    def start_pending(self):
+        """启动时调用：继续上次未完成的任务"""
+        self._schedule()
+
+    def shutdown(self):
+        """退出程序：停止正在下载的任务，下次启动时从 .part 文件续传"""
+        self._closing = True
+        for job_id in list(self._workers):
+            self._stop_worker(job_id)
+            job = self._jobs[job_id]
+            job.status = JOB_QUEUED
+            self._save(job)
+
+    # -- 调度 --
+    def _schedule(self):
+        if self._closing:
+            return
+        for job in self.jobs():
+            if len(self._workers) >= self.max_concurrent:
+                break
+            # 暂停后马上继续时，要等旧线程退出才能重新写同一个 .part 文件
+            if job.status == JOB_QUEUED and job.id not in self._workers and job.id not in self._stopping:
+                self._start_job(job)
+
+    def _start_job(self, job):
+        args = dict(url=job.url, path=job.path, mode=job.mode, start=job.start, end=job.end,
+                    output_format=job.output_format, split_tracks=job.split_tracks,
+                    cue_text=job.cue_text or None, items=job.items or None)
+        if self.worker_host is not None and self.worker_host.available:
+            worker = self.worker_host.create_download(**args)
+        else:
+            worker = BilibiliDownloader(**args)
+        worker.progress_signal.connect(lambda progress, i=job.id: self._on_progress(i, progress))
+        worker.finished_signal.connect(lambda path, _, i=job.id: self._on_finished(i))
+        worker.error_signal.connect(lambda msg, i=job.id: self._on_error(i, msg))
+        worker.finished.connect(lambda i=job.id, w=worker: self._on_worker_done(i, w))
+        self._workers[job.id] = worker
+        self._set_status(job, JOB_RUNNING, "正在连接...")
+        worker.start()
+
+    def _stop_worker(self, job_id):
+        worker = self._workers.pop(job_id, None)
+        if worker is not None:
+            worker.cancel_download()
+            self._stopping[job_id] = worker
+            self._collect_part_files(job_id, worker)
+        self._schedule()
+
+    def _on_progress(self, job_id, progress):
+        job = self._jobs.get(job_id)
+        if job is None or job.status != JOB_RUNNING:
+            return
+        job.progress = progress
+        job.message = progress.summary
+        job.percent = progress.percent
+        self.job_changed.emit(job_id)
+
+    def _on_finished(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None and job.status == JOB_RUNNING:
+            job.percent = 100
+            self._set_status(job, JOB_DONE, "下载完成")
+
+    def _on_error(self, job_id, msg):
+        job = self._jobs.get(job_id)
+        if job is not None and job.status == JOB_RUNNING:
+            self._set_status(job, JOB_FAILED, msg)
+
+    def _on_worker_done(self, job_id, worker):
+        job = self._jobs.get(job_id)
+        self._collect_part_files(job_id, worker)
+        if self._workers.get(job_id) is worker:
+            del self._workers[job_id]
+            # 线程结束却没有报告结果（例如异常退出）时视为失败，可以手动重试
+            if job is not None and job.status == JOB_RUNNING:
+                self._set_status(job, JOB_FAILED, "下载中断")
+        if self._stopping.get(job_id) is worker:
+            del self._stopping[job_id]
+            if job is None:  # 已从列表中移除
+                _delete_files(worker.part_files)
+            elif job.status == JOB_CANCELED:
+                self._remove_part_files(job)
+        self._schedule()
+
+    def _collect_part_files(self, job_id, worker):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if job.status == JOB_DONE:
+            job.part_files.clear()
+        else:
+            job.part_files.update(list(worker.part_files))
+        self._save(job)
+
+    def _set_status(self, job, status, message):
+        if status != JOB_RUNNING:
+            job.progress = None
+        job.status = status
+        job.message = message
+        self._save(job)
+        self.job_changed.emit(job.id)
+
+    def _remove_part_files(self, job):
+        """删除已取消任务留下的未完成文件"""
+        _delete_files(job.part_files)
+        job.part_files.clear()
+        self._save(job)
+
+
+def _delete_files(part_files):
+    for path in list(part_files):
+        for candidate in (path + ".part", path + ".ytdl"):
+            try:
+                if os.path.exists(candidate):
+                    os.remove(candidate)
+            except OSError as e:
+                print(f"无法删除临时文件: {candidate}: {e}")
@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+
+# 下载阶段
+STAGE_DOWNLOADING = 'downloading'
+STAGE_PROCESSING = 'processing'
+
+# 每个任务每秒最多推送的进度次数
+DEFAULT_MAX_UPDATES_PER_SECOND = 4
+# 速度取指数滑动平均；采样间隔太短时误差大，至少隔这么久才计算一次
+SPEED_SMOOTHING = 0.3
+SPEED_SAMPLE_INTERVAL = 0.5
+
+# -- 格式化（界面显示用） --
+def format_bytes(size):
+    size = float(size or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def format_speed(speed):
+    return f"{format_bytes(speed)}/s" if speed else "--"
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+    return f"{seconds // 60:02}:{seconds % 60:02}"
+
+
+# --- 一次进度快照（跨线程传给界面，创建后不再修改） ---
+class DownloadProgress:
+    __slots__ = ('downloaded_bytes', 'total_bytes', 'speed', 'eta', 'item_index',
+                 'item_count', 'items_done', 'filename', 'stage', 'percent',
+                 'processing_total', 'processing_done')
+
+    def __init__(self, downloaded_bytes=0, total_bytes=None, speed=0.0, eta=None, item_index=0,
+                 item_count=1, items_done=0, filename="", stage=STAGE_DOWNLOADING, percent=0,
+                 processing_total=0, processing_done=0):
+        self.downloaded_bytes = downloaded_bytes
+        self.total_bytes = total_bytes     # 估算的总字节数，未知时为 None
+        self.speed = speed                 # 字节/秒
+        self.eta = eta                     # 剩余秒数，未知时为 None
+        self.item_index = item_index       # 最近更新的分P序号
+        self.item_count = item_count
+        self.items_done = items_done
+        self.filename = filename
+        self.stage = stage
+        self.percent = percent              # 下载阶段的进度
+        self.processing_total = processing_total  # 已交给后处理池的文件数
+        self.processing_done = processing_done
+
+    @property
+    def processing_summary(self):
+        if not self.processing_total:
+            return ""
+        return f"{self.processing_done}/{self.processing_total}"
+
+    @property
+    def summary(self):
+        """简短的文字说明：单个文件显示文件名，多个分P显示完成数量"""
+        if self.stage == STAGE_PROCESSING and self.item_count <= 1:
+            return "正在处理文件..."
+        if self.item_count > 1:
+            return f"{self.items_done}/{self.item_count} 个分P"
+        return self.filename
+
+
+# --- 进度汇总：按字节数计算整体进度、速度和剩余时间，并限制推送频率 ---
+class ProgressTracker:
+    def __init__(self, item_count=1, max_updates_per_second=DEFAULT_MAX_UPDATES_PER_SECOND):
+        self.item_count = item_count
+        self.min_interval = 1.0 / max_updates_per_second if max_updates_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        # 分P序号 -> [已下载字节, 总字节, 是否完成]
+        self._items = {}
+        self._last_item = 0
+        self._filename = ""
+        self._stage = STAGE_DOWNLOADING
+        self._last_emit = 0.0
+        self._speed = 0.0
+        self._sample_time = None
+        self._sample_bytes = 0
+        self._processing = set()
+        self._processing_total = 0
+
+    def update(self, index, downloaded, total=None, filename=None):
+        """记录一次下载回调；距上次推送不足 min_interval 时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.setdefault(index, [0, None, False])
+            item[0] = downloaded or 0
+            item[1] = total or item[1]
+            self._last_item = index
+            self._stage = STAGE_DOWNLOADING
+            if filename:
+                self._filename = os.path.basename(filename)
+            self._sample_speed(now)
+            if now - self._last_emit < self.min_interval:
+                return None
+            self._last_emit = now
+            return self._snapshot()
+
+    def finish_item(self, index, stage=STAGE_PROCESSING):
+        """分P下载完成（进入后处理或全部完成），总是返回快照"""
+        with self._lock:
+            item = self._items.setdefault(index, [0, None, False])
+            if item[1]:
+                item[0] = item[1]
+            item[2] = True
+            self._last_item = index
+            self._stage = stage
+            self._last_emit = time.monotonic()
+            return self._snapshot()
+
+    def processing_submitted(self, index):
+        with self._lock:
+            self._processing.add(index)
+            self._processing_total += 1
+            return self._snapshot()
+
+    def processing_finished(self, index):
+        with self._lock:
+            self._processing.discard(index)
+            return self._snapshot()
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _sample_speed(self, now):
+        downloaded = sum(item[0] for item in self._items.values())
+        if self._sample_time is None:
+            self._sample_time, self._sample_bytes = now, downloaded
+            return
+        elapsed = now - self._sample_time
+        if elapsed < SPEED_SAMPLE_INTERVAL:
+            return
+        # 断点续传时已下载字节会跳变，只按增量计算
+        rate = max(0, downloaded - self._sample_bytes) / elapsed
+        self._speed = rate if not self._speed else \
+            SPEED_SMOOTHING * rate + (1 - SPEED_SMOOTHING) * self._speed
+        self._sample_time, self._sample_bytes = now, downloaded
+
+    def _snapshot(self):
+        count = max(self.item_count, len(self._items), 1)
+        downloaded = 0
+        known_totals = []
+        fractions = 0.0
+        done = 0
+        for got, total, finished in self._items.values():
+            downloaded += got
+            if total:
+                known_totals.append(total)
+            if finished:
+                done += 1
+                fractions += 1.0
+            elif total:
+                fractions += min(1.0, got / total)
+
+        total_bytes = None
+        eta = None
+        if known_totals:
+            # 还没开始的分P按已知分P的平均大小估算
+            average = sum(known_totals) / len(known_totals)
+            total_bytes = int(sum(known_totals) + average * max(0, count - len(known_totals)))
+            if self._speed > 0:
+                eta = max(0.0, (total_bytes - downloaded) / self._speed)
+        return DownloadProgress(
+            downloaded_bytes=downloaded,
+            total_bytes=total_bytes,
+            speed=self._speed,
+            eta=eta,
+            item_index=self._last_item,
+            item_count=count,
+            items_done=done,
+            filename=self._filename,
+            # 下载都结束、只剩后处理时进入处理阶段
+            stage=STAGE_PROCESSING if self._processing and done >= count else self._stage,
+            percent=min(100, int(fractions * 100 / count)),
+            processing_total=self._processing_total,
+            processing_done=self._processing_total - len(self._processing),
+        )
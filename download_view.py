@@ -0,0 +1,237 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableView,
+                             QHeaderView, QAbstractItemView, QStyledItemDelegate, QStyle,
+                             QStyleOptionProgressBar, QApplication, QLabel, QSpinBox)
+
+from ui_scale_manager import UIScaleManager
+from theme_manager import ThemeManager
+from style_generator import generate_stylesheet
+from download_manager import JOB_RUNNING
+from download_progress import format_bytes, format_speed, format_eta
+from bandwidth import get_bandwidth_scheduler, TRAFFIC_CLASSES, TRAFFIC_CLASS_TEXT
+from dialogs import BilibiliDownloadDialog
+
+# --- 下载队列模型：数据直接取自 DownloadManager，按任务 ID 定位行 ---
+class DownloadQueueModel(QAbstractTableModel):
+    HEADERS = ["链接", "状态", "下载进度", "速度", "剩余时间", "后处理", "信息"]
+    PROGRESS_COLUMN = 2
+    JobIdRole = Qt.UserRole + 1
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self._ids = [job.id for job in manager.jobs()]
+        self._rows = {job_id: row for row, job_id in enumerate(self._ids)}
+        manager.job_added.connect(self._on_job_added)
+        manager.job_changed.connect(self._on_job_changed)
+        manager.job_removed.connect(self._on_job_removed)
+
+    # -- Qt 模型接口 --
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self.manager.job(self._ids[index.row()])
+        if job is None:
+            return None
+        column = index.column()
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            if column == 0:
+                return job.url
+            if column == 1:
+                return job.status_text
+            if column == self.PROGRESS_COLUMN:
+                return job.percent if role == Qt.DisplayRole else f"{job.percent}%"
+            progress = job.progress
+            if column == 3:
+                return format_speed(progress.speed) if progress else ""
+            if column == 4:
+                return format_eta(progress.eta) if progress else ""
+            if column == 5:
+                return progress.processing_summary if progress else ""
+            if column == 6:
+                if progress and progress.total_bytes and role == Qt.ToolTipRole:
+                    return f"{job.message}（{format_bytes(progress.downloaded_bytes)} / {format_bytes(progress.total_bytes)}）"
+                return job.message
+        elif role == Qt.TextAlignmentRole and column in (1, self.PROGRESS_COLUMN, 3, 4, 5):
+            return Qt.AlignCenter
+        elif role == self.JobIdRole:
+            return job.id
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def job_id_at(self, row):
+        if 0 <= row < len(self._ids):
+            return self._ids[row]
+        return None
+
+    # -- 管理器通知 --
+    def _on_job_added(self, job_id):
+        row = len(self._ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._ids.append(job_id)
+        self._rows[job_id] = row
+        self.endInsertRows()
+
+    def _on_job_changed(self, job_id):
+        row = self._rows.get(job_id)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, 1), self.index(row, len(self.HEADERS) - 1))
+
+    def _on_job_removed(self, job_id):
+        row = self._rows.get(job_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._ids[row]
+        self._rows = {i: r for r, i in enumerate(self._ids)}
+        self.endRemoveRows()
+
+
+# --- 进度列代理：用样式绘制进度条，不创建真实控件 ---
+class DownloadProgressDelegate(QStyledItemDelegate):
+    def paint(self, painter, option, index):
+        percent = index.data(Qt.DisplayRole) or 0
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(4, 4, -4, -4)
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = percent
+        bar.text = f"{percent}%"
+        bar.textVisible = True
+        bar.textAlignment = Qt.AlignCenter
+        bar.state = option.state
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ProgressBar, bar, painter, option.widget)
+
+
+# --- 下载管理窗口 ---
+class DownloadManagerDialog(QDialog):
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("下载管理")
+        self.manager = manager
+
+        screen = QApplication.primaryScreen()
+        screen_size = screen.size()
+        self.scale_manager = parent.scale_manager if hasattr(parent, 'scale_manager') else UIScaleManager()
+        self.theme_manager = parent.theme_manager if hasattr(parent, 'theme_manager') else ThemeManager()
+
+        dialog_width = self.scale_manager.get_scaled_size(screen_size.width(), screen_size.height(), 800)
+        dialog_height = self.scale_manager.get_scaled_size(screen_size.width(), screen_size.height(), 500)
+        self.resize(dialog_width, dialog_height)
+
+        theme = self.theme_manager.get_theme()
+        self.setStyleSheet(generate_stylesheet(theme, self.scale_manager, screen_size.width(), screen_size.height()))
+
+        layout = QVBoxLayout(self)
+        padding = self.scale_manager.get_scaled_padding(screen_size.width(), screen_size.height())
+        layout.setContentsMargins(padding*2, padding*2, padding*2, padding*2)
+        layout.setSpacing(padding)
+
+        # 工具栏
+        toolbar = QHBoxLayout()
+        self.new_btn = QPushButton("新建下载")
+        self.new_btn.setProperty("class", "primary")
+        self.new_btn.clicked.connect(self.show_new_download)
+        self.pause_btn = QPushButton("暂停")
+        self.pause_btn.clicked.connect(lambda: self._apply(self.manager.pause))
+        self.resume_btn = QPushButton("继续")
+        self.resume_btn.clicked.connect(lambda: self._apply(self.manager.resume))
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.clicked.connect(lambda: self._apply(self.manager.cancel))
+        self.remove_btn = QPushButton("移除")
+        self.remove_btn.clicked.connect(lambda: self._apply(self.manager.remove))
+        self.clear_btn = QPushButton("清除已完成")
+        self.clear_btn.clicked.connect(self.manager.clear_finished)
+        for btn in (self.new_btn, self.pause_btn, self.resume_btn, self.cancel_btn,
+                    self.remove_btn, self.clear_btn):
+            toolbar.addWidget(btn)
+        toolbar.addStretch()
+
+        toolbar.addWidget(QLabel("同时下载:"))
+        self.concurrent_spin = QSpinBox()
+        self.concurrent_spin.setRange(1, 8)
+        self.concurrent_spin.setValue(manager.max_concurrent)
+        self.concurrent_spin.valueChanged.connect(manager.set_max_concurrent)
+        toolbar.addWidget(self.concurrent_spin)
+        layout.addLayout(toolbar)
+
+        # 队列列表
+        self.model = DownloadQueueModel(manager, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setItemDelegateForColumn(DownloadQueueModel.PROGRESS_COLUMN, DownloadProgressDelegate(self.table))
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(6, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        # 带宽：各类流量的限速（运行时生效）和实时速度
+        self.bandwidth = get_bandwidth_scheduler()
+        bandwidth_bar = QHBoxLayout()
+        bandwidth_bar.addWidget(QLabel("限速 (KB/s，0 为不限):"))
+        self.budget_spins = {}
+        for traffic_class in TRAFFIC_CLASSES:
+            spin = QSpinBox()
+            spin.setRange(0, 1024 * 1024)
+            spin.setSingleStep(128)
+            spin.setValue(self.bandwidth.budget(traffic_class) // 1024)
+            spin.valueChanged.connect(lambda value, c=traffic_class: self.bandwidth.set_budget(c, value * 1024))
+            bandwidth_bar.addWidget(QLabel(TRAFFIC_CLASS_TEXT[traffic_class]))
+            bandwidth_bar.addWidget(spin)
+            self.budget_spins[traffic_class] = spin
+        bandwidth_bar.addStretch()
+        self.throughput_label = QLabel()
+        bandwidth_bar.addWidget(self.throughput_label)
+        layout.addLayout(bandwidth_bar)
+        self.throughput_timer = QTimer(self)
+        self.throughput_timer.timeout.connect(self.update_throughput)
+        self.throughput_timer.start(1000)
+        self.update_throughput()
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        manager.job_changed.connect(self.update_summary)
+        manager.job_added.connect(self.update_summary)
+        manager.job_removed.connect(self.update_summary)
+        self.update_summary()
+
+        self.new_download_dialog = None
+
+    def update_throughput(self):
+        rates = self.bandwidth.throughput()
+        self.throughput_label.setText("实时: " + "  ".join(
+            f"{TRAFFIC_CLASS_TEXT[c]} {format_speed(rates[c])}" for c in TRAFFIC_CLASSES))
+
+    def selected_job_ids(self):
+        rows = {index.row() for index in self.table.selectionModel().selectedRows()}
+        return [self.model.job_id_at(row) for row in sorted(rows)]
+
+    def _apply(self, action):
+        for job_id in self.selected_job_ids():
+            action(job_id)
+
+    def update_summary(self, *_):
+        jobs = self.manager.jobs()
+        running = sum(1 for job in jobs if job.status == JOB_RUNNING)
+        waiting = sum(1 for job in jobs if job.is_active) - running
+        self.summary_label.setText(f"共 {len(jobs)} 个任务，正在下载 {running} 个，等待 {waiting} 个")
+
+    def show_new_download(self):
+        if self.new_download_dialog is None:
+            self.new_download_dialog = BilibiliDownloadDialog(self, manager=self.manager)
+        self.new_download_dialog.show()
+        self.new_download_dialog.raise_()
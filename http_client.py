@@ -0,0 +1,68 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bandwidth import get_bandwidth_scheduler, TRAFFIC_INTERACTIVE
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# --- 共享 HTTP 客户端：按主机复用 keep-alive 连接，自动解压 gzip ---
+class HttpClient:
+    def __init__(self, connect_timeout=3.05, read_timeout=10,
+                 pool_connections=8, pool_maxsize=16, retries=1):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        # pool_connections: 缓存多少个主机的连接池；pool_maxsize: 每个主机最多保持的连接数
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def set_timeouts(self, connect_timeout=None, read_timeout=None):
+        connect, read = self.timeout
+        self.timeout = (connect_timeout or connect, read_timeout or read)
+
+    def request(self, method, url, timeout=None, traffic_class=TRAFFIC_INTERACTIVE, **kwargs):
+        """traffic_class 决定使用哪一类带宽额度；交互请求进行时下载会让路"""
+        scheduler = get_bandwidth_scheduler()
+        with scheduler.transfer(traffic_class):
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            response.raise_for_status()
+            # 响应已读完，超出额度的部分由这次调用等待偿还
+            scheduler.consume(traffic_class, len(response.content))
+        return response
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        return self.request('GET', url, params=params, timeout=timeout, **kwargs)
+
+    def post(self, url, data=None, timeout=None, **kwargs):
+        return self.request('POST', url, data=data, timeout=timeout, **kwargs)
+
+    def get_json(self, url, params=None, timeout=None, traffic_class=TRAFFIC_INTERACTIVE):
+        return self.get(url, params=params, timeout=timeout, traffic_class=traffic_class).json()
+
+    def post_json(self, url, data=None, timeout=None, traffic_class=TRAFFIC_INTERACTIVE):
+        return self.post(url, data=data, timeout=timeout, traffic_class=traffic_class).json()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_http_client():
+    """所有网络线程共用的 HTTP 客户端"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,198 @@
+import os
+import re
+import sqlite3
+import threading
+
+from utils import ms_to_str, get_app_data_dir
+
+# 中日韩字符按单字分词，这样“周杰”也能命中“周杰伦”
+_CJK_RE = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+
+def _segment(text):
+    return _CJK_RE.sub(r' \1 ', text or "").strip()
+
+def build_match_query(keyword):
+    """把用户输入转成 FTS5 查询：每个词是一个短语，末尾的拉丁词支持前缀匹配"""
+    terms = []
+    for word in keyword.split():
+        tokens = _segment(word).split()
+        if not tokens:
+            continue
+        phrase = " ".join(t.replace('"', '""') for t in tokens)
+        prefix = "" if _CJK_RE.fullmatch(tokens[-1]) else "*"
+        terms.append(f'"{phrase}"{prefix}')
+    return " ".join(terms)
+
+
+# --- 本地曲库索引（SQLite + FTS5） ---
+class LibraryIndex:
+    def __init__(self, path=None, flush_size=500, rank_limit=1000):
+        self.path = path or os.path.join(get_app_data_dir(), "library.db")
+        self.flush_size = flush_size
+        # 命中数不超过 rank_limit 时按 bm25 排序；更宽泛的查询直接取前若干条，保证毫秒级返回
+        self.rank_limit = rank_limit
+        # 每个线程各自一个连接；WAL 模式下搜索不会被扫描写入阻塞
+        self._local = threading.local()
+        self._pending = []
+        self._lock = threading.Lock()
+        self.fts_enabled = True
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL DEFAULT '',
+                artist TEXT NOT NULL DEFAULT '',
+                album TEXT NOT NULL DEFAULT '',
+                duration INTEGER NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL DEFAULT 0,
+                mtime INTEGER NOT NULL DEFAULT 0
+            )""")
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts
+                USING fts5(title, artist, album,
+                           tokenize='unicode61 remove_diacritics 2', prefix='2 3')""")
+        except sqlite3.OperationalError as e:
+            print(f"SQLite 不支持 FTS5，改用普通查询: {e}")
+            self.fts_enabled = False
+        conn.commit()
+
+    # -- 扫描器接口：按 (路径, 大小, 修改时间) 判断文件是否变化 --
+    def lookup(self, path, size, mtime):
+        row = self._conn().execute(
+            "SELECT * FROM tracks WHERE path = ?", (path,)).fetchone()
+        if row and row['size'] == size and row['mtime'] == mtime:
+            return self._row_to_song(row)
+        return None
+
+    def store(self, song):
+        with self._lock:
+            self._pending.append(song)
+            should_flush = len(self._pending) >= self.flush_size
+        if should_flush:
+            self.flush()
+
+    def save(self):
+        self.flush()
+
+    def flush(self):
+        """把缓冲的写入放在一个事务里提交"""
+        with self._lock:
+            songs, self._pending = self._pending, []
+        if not songs:
+            return
+        conn = self._conn()
+        with conn:
+            for song in songs:
+                conn.execute("""
+                    INSERT INTO tracks (path, title, artist, album, duration, size, mtime)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        title = excluded.title, artist = excluded.artist,
+                        album = excluded.album, duration = excluded.duration,
+                        size = excluded.size, mtime = excluded.mtime""",
+                    (song['path'], song.get('name', ''), song.get('artist', ''),
+                     song.get('album', ''), song.get('duration', 0),
+                     song.get('size', 0), song.get('mtime', 0)))
+                track_id = conn.execute(
+                    "SELECT id FROM tracks WHERE path = ?", (song['path'],)).fetchone()[0]
+                if self.fts_enabled:
+                    conn.execute("DELETE FROM tracks_fts WHERE rowid = ?", (track_id,))
+                    conn.execute(
+                        "INSERT INTO tracks_fts (rowid, title, artist, album) VALUES (?, ?, ?, ?)",
+                        (track_id, _segment(song.get('name', '')),
+                         _segment(song.get('artist', '')), _segment(song.get('album', ''))))
+
+    def prune(self, seen_paths, roots):
+        """删除扫描目录 roots 下本次扫描中已不存在的文件，返回删除数量；其他目录的歌曲保留"""
+        self.flush()
+        conn = self._conn()
+        stale = []
+        for root in roots:
+            # 以分隔符结尾，避免 /music 误删 /music2 下的歌曲
+            prefix = os.path.join(root, "")
+            rows = conn.execute("SELECT id, path FROM tracks WHERE substr(path, 1, ?) = ?",
+                                (len(prefix), prefix)).fetchall()
+            stale.extend((row['id'],) for row in rows if row['path'] not in seen_paths)
+        stale = list(dict.fromkeys(stale))
+        if stale:
+            with conn:
+                conn.executemany("DELETE FROM tracks WHERE id = ?", stale)
+                if self.fts_enabled:
+                    conn.executemany("DELETE FROM tracks_fts WHERE rowid = ?", stale)
+        return len(stale)
+
+    # -- 查询 --
+    def search(self, keyword, limit=200):
+        keyword = keyword.strip()
+        if not keyword:
+            return []
+        conn = self._conn()
+        if self.fts_enabled:
+            query = build_match_query(keyword)
+            if not query:
+                return []
+            matched = conn.execute(
+                "SELECT rowid FROM tracks_fts WHERE tracks_fts MATCH ? LIMIT ?",
+                (query, self.rank_limit + 1)).fetchall()
+            if len(matched) <= self.rank_limit:
+                rows = conn.execute("""
+                    SELECT t.* FROM tracks_fts
+                    JOIN tracks t ON t.id = tracks_fts.rowid
+                    WHERE tracks_fts MATCH ?
+                    ORDER BY bm25(tracks_fts, 10.0, 5.0, 1.0)
+                    LIMIT ?""", (query, limit)).fetchall()
+            else:
+                ids = [row[0] for row in matched[:limit]]
+                placeholders = ",".join("?" * len(ids))
+                rows = conn.execute(
+                    f"SELECT * FROM tracks WHERE id IN ({placeholders})", ids).fetchall()
+        else:
+            like = f"%{keyword}%"
+            rows = conn.execute("""
+                SELECT * FROM tracks
+                WHERE title LIKE ? OR artist LIKE ? OR album LIKE ?
+                LIMIT ?""", (like, like, like, limit)).fetchall()
+        return [self._row_to_song(row) for row in rows]
+
+    def all_tracks(self):
+        rows = self._conn().execute("SELECT * FROM tracks ORDER BY artist, title").fetchall()
+        return [self._row_to_song(row) for row in rows]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _row_to_song(row):
+        return {
+            'name': row['title'],
+            'artist': row['artist'] or "未知",
+            'album': row['album'],
+            'duration': row['duration'],
+            'duration_str': ms_to_str(row['duration']),
+            'path': row['path'],
+            'size': row['size'],
+            'mtime': row['mtime'],
+            'source': 'local',
+        }
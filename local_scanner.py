@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from PyQt5.QtCore import pyqtSignal
+
+from utils import ms_to_str
+from library_index import LibraryIndex
+from task_executor import Task, LANE_LIBRARY
+
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+AUDIO_EXTENSIONS = {'.mp3', '.flac', '.m4a', '.aac', '.ogg', '.opus', '.wav', '.wma', '.ape'}
+
+# -- 辅助函数 --
+def _first_tag(tags, key):
+    if not tags:
+        return ""
+    value = tags.get(key)
+    if isinstance(value, list):
+        value = value[0] if value else ""
+    return str(value).strip() if value else ""
+
+def read_track_info(path, size, mtime):
+    """读取单个文件的标签和时长（在工作线程中调用）"""
+    base = os.path.splitext(os.path.basename(path))[0]
+    # 没有标签时按“歌手 - 歌名”解析文件名
+    artist, _, title = base.partition(" - ")
+    if not title:
+        artist, title = "", base
+
+    album = ""
+    duration = 0
+    if mutagen:
+        try:
+            audio = mutagen.File(path, easy=True)
+            if audio is not None:
+                title = _first_tag(audio.tags, 'title') or title
+                artist = _first_tag(audio.tags, 'artist') or artist
+                album = _first_tag(audio.tags, 'album')
+                if audio.info and getattr(audio.info, 'length', None):
+                    duration = int(audio.info.length * 1000)
+        except Exception as e:
+            print(f"读取标签失败: {path}: {e}")
+
+    return {
+        'name': title,
+        'artist': artist or "未知",
+        'album': album,
+        'duration': duration,
+        'duration_str': ms_to_str(duration),
+        'path': path,
+        'size': size,
+        'mtime': mtime,
+        'source': 'local',
+    }
+
+def _list_dir(path):
+    """列出一个目录：返回 (子目录, [(文件路径, 大小, 修改时间)])"""
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                        st = entry.stat()
+                        files.append((entry.path, st.st_size, int(st.st_mtime)))
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"无法读取目录: {path}: {e}")
+    return subdirs, files
+
+
+# --- 本地音乐扫描任务 ---
+class LocalMusicScanner(Task):
+    lane = LANE_LIBRARY
+    batch_ready = pyqtSignal(list)          # 一批歌曲
+    progress_signal = pyqtSignal(int, int)  # 已处理文件数, 已发现文件数
+    finished_signal = pyqtSignal(int, int)  # 歌曲总数, 新读取的文件数
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, folders, index=None, max_workers=None, batch_size=200):
+        super().__init__()
+        self.folders = [f for f in folders if f]
+        # 曲库索引同时记录 (路径, 大小, 修改时间)，未变化的文件直接复用
+        self.index = index
+        # 目录遍历和标签读取大多在等 I/O（尤其是 NAS），线程数可以比 CPU 核数多
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+        self.batch_size = batch_size
+
+    def run(self):
+        try:
+            index = self.index or LibraryIndex()
+            self.index = index
+            total, updated = self._scan(index)
+            index.save()
+            if not self.is_canceled:
+                self.finished_signal.emit(total, updated)
+        except Exception as e:
+            self.error_signal.emit(f"扫描失败: {str(e)}")
+
+    def _scan(self, index):
+        batch = []
+        seen = set()
+        processed = 0
+        updated = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {pool.submit(_list_dir, folder): 'dir' for folder in self.folders}
+            while pending and not self.is_canceled:
+                done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind = pending.pop(future)
+                    if kind == 'dir':
+                        subdirs, files = future.result()
+                        for subdir in subdirs:
+                            pending[pool.submit(_list_dir, subdir)] = 'dir'
+                        for path, size, mtime in files:
+                            seen.add(path)
+                            song = index.lookup(path, size, mtime)
+                            if song:
+                                batch.append(song)
+                                processed += 1
+                            else:
+                                pending[pool.submit(read_track_info, path, size, mtime)] = 'file'
+                    else:
+                        song = future.result()
+                        index.store(song)
+                        batch.append(song)
+                        processed += 1
+                        updated += 1
+
+                # 攒够一批、超时无新结果或全部完成时推送给界面
+                if batch and (len(batch) >= self.batch_size or not done or not pending):
+                    self.batch_ready.emit(batch)
+                    batch = []
+                    self.progress_signal.emit(processed, len(seen))
+
+            if self.is_canceled:
+                for future in pending:
+                    future.cancel()
+                return processed, updated
+
+        if batch:
+            self.batch_ready.emit(batch)
+        index.prune(seen, self.folders)
+        self.progress_signal.emit(processed, len(seen))
+        return processed, updated
@@ -0,0 +1,220 @@
+import re
+from array import array
+from bisect import bisect_right
+
+_TIME_TAG_RE = re.compile(r'\[(\d+):(\d+)(?:[.:](\d+))?\]')
+_OFFSET_RE = re.compile(r'\[offset:\s*([+-]?\d+)\s*\]', re.IGNORECASE)
+# 逐字歌词（网易云 yrc / klyric）：[行开始,行时长](字开始,字时长[,0])字
+_WORD_LINE_RE = re.compile(r'^\[(\d+),(\d+)\](.*)$')
+_WORD_RE = re.compile(r'\((\d+),(\d+)(?:,[-\d]+)?\)([^(]*)')
+# 翻译与原文时间戳允许的误差（毫秒）；逐字歌词的行时间和 lrc 略有出入，放宽一些
+_TRANSLATION_TOLERANCE = 50
+_WORD_TRANSLATION_TOLERANCE = 1000
+
+# -- 辅助函数 --
+def _tag_to_ms(minutes, seconds, fraction):
+    ms = int(minutes) * 60000 + int(seconds) * 1000
+    if fraction:
+        # 1 位是十分之一秒，2 位是百分之一秒，3 位是毫秒
+        ms += int(fraction.ljust(3, '0')[:3])
+    return ms
+
+def _find_offset(text):
+    match = _OFFSET_RE.search(text or "")
+    return int(match.group(1)) if match else None
+
+def _parse_entries(text, default_offset=0):
+    """解析 LRC 文本，返回按时间排序的 [(毫秒, 文本)]，已应用 [offset:]"""
+    if not text:
+        return []
+    offset = _find_offset(text)
+    if offset is None:
+        offset = default_offset
+
+    entries = []
+    for raw_line in text.splitlines():
+        # 手工编辑或其他软件导出的歌词行首可能有空白
+        raw_line = raw_line.lstrip()
+        pos = 0
+        stamps = []
+        # 一行可以有多个时间标签：[00:12.00][01:30.00]歌词
+        while True:
+            tag = _TIME_TAG_RE.match(raw_line, pos)
+            if not tag:
+                break
+            stamps.append(_tag_to_ms(*tag.groups()))
+            pos = tag.end()
+        if not stamps:
+            continue
+        content = raw_line[pos:].strip()
+        for ms in stamps:
+            # offset 为正表示歌词提前显示
+            entries.append((max(0, ms - offset), content))
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+
+def parse_word_lyric(text):
+    """解析逐字歌词，返回按时间排序的 [(行开始毫秒, LineWords)]
+
+    yrc 中字的时间是绝对时间；klyric 中字的开始都写成 0，按前面各字的时长累加；
+    也兼容相对行开始的写法。都转成绝对时间。
+    """
+    result = []
+    for raw_line in (text or "").splitlines():
+        match = _WORD_LINE_RE.match(raw_line.strip())
+        if not match:
+            continue
+        line_start = int(match.group(1))
+        starts = array('i')
+        ends = array('i')
+        texts = []
+        words = _WORD_RE.findall(match.group(3))
+        offsets = [int(w[0]) for w in words]
+        cumulative = len(words) > 1 and not any(offsets)
+        relative = bool(words) and offsets[0] < line_start
+        elapsed = 0
+        for word_start, word_duration, word_text in words:
+            if cumulative:
+                start = line_start + elapsed
+                elapsed += int(word_duration)
+            else:
+                start = int(word_start) + (line_start if relative else 0)
+            starts.append(start)
+            ends.append(start + int(word_duration))
+            texts.append(word_text)
+        if texts:
+            result.append((line_start, LineWords(starts, ends, texts)))
+    result.sort(key=lambda e: e[0])
+    return result
+
+
+# --- 一行的逐字时间 ---
+class LineWords:
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self, starts, ends, texts):
+        self.starts = starts
+        self.ends = ends
+        self.texts = texts
+
+    @property
+    def text(self):
+        return "".join(self.texts)
+
+    def progress_at(self, ms):
+        """(已唱完的字数, 当前字内的进度 0~1)"""
+        index = bisect_right(self.starts, ms) - 1
+        if index < 0:
+            return 0, 0.0
+        start, end = self.starts[index], self.ends[index]
+        if ms >= end:
+            return index + 1, 0.0
+        return index, (ms - start) / (end - start) if end > start else 1.0
+
+    @property
+    def end_time(self):
+        return self.ends[-1] if self.ends else 0
+
+
+# --- 歌词时间轴：时间存放在紧凑的 array('i') 中，用二分查找当前行 ---
+class LyricTimeline:
+    __slots__ = ('times', 'lines', 'translations', 'words')
+
+    def __init__(self, times=None, lines=None, translations=None, words=None):
+        self.times = times if times is not None else array('i')
+        self.lines = lines if lines is not None else []
+        self.translations = translations if translations is not None else []
+        # 每行的 LineWords；没有逐字时间的行为 None
+        self.words = words if words is not None else []
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def index_at(self, ms):
+        """当前应显示的行号，第一行之前返回 -1"""
+        return bisect_right(self.times, ms) - 1
+
+    def line_at(self, ms):
+        index = self.index_at(ms)
+        return self.lines[index] if index >= 0 else ""
+
+    def translation(self, index):
+        if 0 <= index < len(self.translations):
+            return self.translations[index] or ""
+        return ""
+
+    def line_words(self, index):
+        if 0 <= index < len(self.words):
+            return self.words[index]
+        return None
+
+    def next_time(self, index):
+        """下一行的开始时间，已是最后一行时返回 None"""
+        if index + 1 < len(self.times):
+            return self.times[index + 1]
+        return None
+
+    def context(self, index):
+        """(上一行, 当前行, 下一行) 文本，供桌面歌词显示"""
+        def text(i):
+            return self.lines[i] if 0 <= i < len(self.lines) else ""
+        return text(index - 1), text(index), text(index + 1)
+
+
+def parse_lrc(lrc_text, tlyric_text=None, word_text=None):
+    """解析歌词；tlyric_text 为网易云的翻译歌词，按时间戳对齐到原文
+
+    word_text 为逐字歌词（yrc 或 klyric），有内容时以它的行作为时间轴。
+    """
+    entries = _parse_entries(lrc_text)
+    lrc_offset = _find_offset(lrc_text) or 0
+    tolerance = _TRANSLATION_TOLERANCE
+    word_lines = parse_word_lyric(word_text)
+    if word_lines:
+        entries = [(max(0, ms - lrc_offset), words.text) for ms, words in word_lines]
+        tolerance = _WORD_TRANSLATION_TOLERANCE
+    times = array('i', (ms for ms, _ in entries))
+    lines = [content for _, content in entries]
+    words = [words for _, words in word_lines]
+    if word_lines and lrc_offset:
+        for line_words in words:
+            for i in range(len(line_words.starts)):
+                line_words.starts[i] -= lrc_offset
+                line_words.ends[i] -= lrc_offset
+
+    translations = []
+    # 翻译没有自己的 offset 时沿用原文的，保证两者仍然对齐
+    trans_entries = _parse_entries(tlyric_text, lrc_offset)
+    if trans_entries:
+        trans_times = array('i', (ms for ms, _ in trans_entries))
+        for ms in times:
+            # 找到时间最接近的翻译行
+            pos = bisect_right(trans_times, ms)
+            best = None
+            for i in (pos - 1, pos):
+                if 0 <= i < len(trans_times) and abs(trans_times[i] - ms) <= tolerance:
+                    if best is None or abs(trans_times[i] - ms) < abs(trans_times[best] - ms):
+                        best = i
+            translations.append(trans_entries[best][1] if best is not None else None)
+
+    return LyricTimeline(times, lines, translations, words)
+
+
+def load_lrc_file(path, translation_path=None, word_path=None):
+    """读取 .lrc 文件（可选同时读取翻译文件和逐字歌词文件）"""
+    def read(p):
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                with open(p, 'r', encoding=encoding) as f:
+                    return f.read()
+            except UnicodeDecodeError:
+                continue
+        return ""
+
+    tlyric = read(translation_path) if translation_path else None
+    word_lyric = read(word_path) if word_path else None
+    return parse_lrc(read(path), tlyric, word_lyric)
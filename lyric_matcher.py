@@ -0,0 +1,182 @@
+import os
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from PyQt5.QtCore import pyqtSignal
+
+from utils import get_app_data_dir, search_songs_online, download_lyrics
+from lyric_store import get_lyric_store
+from match_ranker import DEFAULT_THRESHOLD, best_candidate
+from task_executor import Task, LANE_LYRICS
+from bandwidth import TRAFFIC_LYRICS
+
+# 匹配记录的状态：已绑定 / 没有合适结果 / 出错
+STATUS_MATCHED = 'matched'
+STATUS_NO_MATCH = 'no_match'
+STATUS_ERROR = 'error'
+# 没有结论的歌曲过多久再重试（秒）：网易云可能后来补上歌词，出错多半是网络问题
+RETRY_DELAYS = {
+    STATUS_NO_MATCH: 7 * 24 * 3600,
+    STATUS_ERROR: 3600,
+}
+
+# --- 请求限速：所有工作线程共用，保证请求间隔不小于 1/rate 秒 ---
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, token=None):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next - now
+            self._next = max(now, self._next) + self.interval
+        while wait_time > 0:
+            if token is not None and token.is_canceled:
+                return False
+            time.sleep(min(wait_time, 0.2))
+            wait_time -= 0.2
+        return True
+
+
+# --- 匹配进度记录：中断后重新运行时跳过已处理的歌曲 ---
+class MatchJournal:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_app_data_dir(), "lyric_match.db")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS matches (
+                path TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                song_id TEXT,
+                score REAL,
+                updated_at REAL NOT NULL,
+                retry_after REAL
+            )""")
+        # 旧版本创建的表缺少 retry_after；已有的记录从上次处理的时间开始计算
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(matches)")}
+        if 'retry_after' not in columns:
+            self._db.execute("ALTER TABLE matches ADD COLUMN retry_after REAL")
+            for status, delay in RETRY_DELAYS.items():
+                self._db.execute("UPDATE matches SET retry_after = updated_at + ? WHERE status = ?",
+                                 (delay, status))
+        self._db.commit()
+
+    def finished_paths(self):
+        """不需要再处理的歌曲：已匹配的，以及还没到重试时间的"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM matches WHERE retry_after IS NULL OR retry_after > ?",
+                (time.time(),)).fetchall()
+        return {row[0] for row in rows}
+
+    def record(self, path, status, song_id=None, score=None):
+        now = time.time()
+        delay = RETRY_DELAYS.get(status)
+        retry_after = now + delay if delay is not None else None
+        with self._lock:
+            self._db.execute("""
+                INSERT OR REPLACE INTO matches (path, status, song_id, score, updated_at, retry_after)
+                VALUES (?, ?, ?, ?, ?, ?)""", (path, status, song_id, score, now, retry_after))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM matches")
+            self._db.commit()
+
+
+# --- 批量匹配任务：并发搜索、自动打分，超过阈值的下载并绑定歌词 ---
+class BatchLyricMatcher(Task):
+    lane = LANE_LYRICS
+    progress_signal = pyqtSignal(int, int, float)    # 已处理数, 总数, 每分钟处理歌曲数
+    track_matched = pyqtSignal(str, str, float)      # 歌曲路径, 网易云歌曲 ID, 分数
+    finished_signal = pyqtSignal(int, int)           # 匹配成功数, 本次处理数
+
+    def __init__(self, tracks, journal=None, threshold=DEFAULT_THRESHOLD,
+                 max_workers=4, requests_per_second=5.0, search_limit=10):
+        super().__init__()
+        self.tracks = tracks
+        self.journal = journal
+        self.threshold = threshold
+        self.max_workers = max_workers
+        # 搜索和歌词下载共用一个限速器，避免被网易云接口限流
+        self.limiter = RateLimiter(requests_per_second)
+        self.search_limit = search_limit
+
+    @staticmethod
+    def needs_lyrics(track):
+        path = track.get('path')
+        return bool(path) and not os.path.exists(os.path.splitext(path)[0] + ".lrc")
+
+    def run(self):
+        journal = self.journal or MatchJournal()
+        self.journal = journal
+        finished = journal.finished_paths()
+        pending = [t for t in self.tracks
+                   if self.needs_lyrics(t) and t['path'] not in finished]
+
+        total = len(pending)
+        processed = 0
+        matched = 0
+        started = time.monotonic()
+        self.progress_signal.emit(0, total, 0.0)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            queue = iter(pending)
+            futures = {}
+            # 只保持少量任务在排队，取消后能很快停下
+            for track in queue:
+                futures[pool.submit(self._match_one, track)] = track
+                if len(futures) >= self.max_workers * 2:
+                    break
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    track = futures.pop(future)
+                    status, song_id, score = future.result()
+                    if status is None:  # 已取消
+                        continue
+                    journal.record(track['path'], status, song_id, score)
+                    processed += 1
+                    if status == STATUS_MATCHED:
+                        matched += 1
+                        self.track_matched.emit(track['path'], song_id, score)
+                    if not self.is_canceled:
+                        next_track = next(queue, None)
+                        if next_track is not None:
+                            futures[pool.submit(self._match_one, next_track)] = next_track
+                minutes = (time.monotonic() - started) / 60
+                self.progress_signal.emit(processed, total, processed / minutes if minutes > 0 else 0.0)
+
+        self.finished_signal.emit(matched, processed)
+
+    def _match_one(self, track):
+        """返回 (状态, 歌曲 ID, 分数)；任务被取消时状态为 None"""
+        try:
+            keyword = track.get('name') or os.path.splitext(os.path.basename(track['path']))[0]
+            if track.get('artist') and track['artist'] != "未知":
+                keyword = f"{keyword} {track['artist']}"
+            if not self.limiter.acquire(self.token):
+                return None, None, None
+            candidates = search_songs_online(keyword, limit=self.search_limit,
+                                             traffic_class=TRAFFIC_LYRICS)
+            best, score = best_candidate(track, candidates)
+            if best is None or score < self.threshold:
+                return STATUS_NO_MATCH, None, score
+
+            song_id = str(best['id'])
+            lrc_path = os.path.splitext(track['path'])[0] + ".lrc"
+            # 仓库里已有的歌词不占用请求配额
+            if not get_lyric_store().contains(song_id) and not self.limiter.acquire(self.token):
+                return None, None, None
+            if download_lyrics(song_id, lrc_path, self.token) is None:
+                return (None, None, None) if self.is_canceled else (STATUS_NO_MATCH, song_id, score)
+            return STATUS_MATCHED, song_id, score
+        except Exception as e:
+            print(f"自动匹配歌词失败: {track.get('path')}: {e}")
+            return STATUS_ERROR, None, None
@@ -0,0 +1,94 @@
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QColor, QFont, QFontMetricsF
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+
+# --- 歌词面板代理：当前行有逐字时间时绘制从左到右的高亮扫过效果 ---
+class LyricPanelDelegate(QStyledItemDelegate):
+    def __init__(self, view, theme):
+        super().__init__(view)
+        self.view = view
+        self.theme = theme
+        self.current_row = -1
+        self.words = None
+        self._sweep_x = 0.0
+        # 上次绘制时当前行第一行文字的位置和每个字的右边缘，用于计算重绘区域
+        self._text_rect = None
+        self._edges = None
+
+    def set_theme(self, theme):
+        self.theme = theme
+        self.view.viewport().update()
+
+    def set_line(self, row, words):
+        """切换当前行（words 为 None 表示该行没有逐字时间）"""
+        self.current_row = row
+        self.words = words
+        self._sweep_x = 0.0
+        self._text_rect = None
+        self._edges = None
+
+    def set_progress(self, row, position_ms):
+        if row != self.current_row or not self.words:
+            return
+        if self._edges is None or self._text_rect is None:
+            # 还没有绘制过，重绘整行一次以建立几何信息
+            item = self.view.item(row)
+            if item is not None:
+                self.view.viewport().update(self.view.visualItemRect(item))
+            return
+
+        done, fraction = self.words.progress_at(position_ms)
+        left = self._edges[done - 1] if done > 0 else 0.0
+        x = left
+        if done < len(self._edges):
+            x += (self._edges[done] - left) * fraction
+        if abs(x - self._sweep_x) < 0.5:
+            return
+        old_x, self._sweep_x = self._sweep_x, x
+        dirty = QRectF(self._text_rect.x() + min(old_x, x) - 1, self._text_rect.y(),
+                       abs(x - old_x) + 2, self._text_rect.height())
+        self.view.viewport().update(dirty.toAlignedRect())
+
+    def paint(self, painter, option, index):
+        if index.row() != self.current_row or not self.words:
+            super().paint(painter, option, index)
+            return
+
+        # 先按普通方式画背景，文字自己画
+        self.initStyleOption(option, index)
+        text = option.text
+        option.text = ""
+        style = option.widget.style() if option.widget else self.view.style()
+        style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+        main_text, _, translation = text.partition("\n")
+        font = QFont(option.font)
+        font.setBold(True)
+        metrics = QFontMetricsF(font)
+        line_height = metrics.height()
+        total_height = line_height * (2 if translation else 1)
+        top = option.rect.y() + (option.rect.height() - total_height) / 2
+        width = metrics.horizontalAdvance(main_text)
+        text_rect = QRectF(option.rect.x() + (option.rect.width() - width) / 2, top, width, line_height)
+
+        edges = []
+        prefix = ""
+        for word in self.words.texts:
+            prefix += word
+            edges.append(metrics.horizontalAdvance(prefix))
+        self._edges = edges
+        self._text_rect = text_rect
+
+        painter.save()
+        painter.setFont(font)
+        painter.setPen(QColor(self.theme['text_secondary']))
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, main_text)
+        painter.setClipRect(QRectF(text_rect.x(), text_rect.y(), self._sweep_x, line_height))
+        painter.setPen(QColor(self.theme['primary']))
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, main_text)
+        painter.setClipping(False)
+        if translation:
+            painter.setPen(QColor(self.theme['text_tertiary']))
+            painter.drawText(QRectF(option.rect.x(), top + line_height, option.rect.width(), line_height),
+                             Qt.AlignCenter, translation)
+        painter.restore()
@@ -0,0 +1,255 @@
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+from PyQt5.QtCore import pyqtSignal
+
+from utils import get_app_data_dir, lyric_sidecar_paths
+from task_executor import Task, LANE_LYRICS
+
+# 默认最多占用 200MB，超出后按最近访问时间淘汰
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+VARIANTS = ('lrc', 'tlyric', 'word')
+
+_ID_TAG_RE = re.compile(r'\[(?:id|musicid|neteaseid):\s*(\d+)\s*\]', re.IGNORECASE)
+
+def _read_text(path):
+    for encoding in ('utf-8-sig', 'gbk'):
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return f.read()
+        except UnicodeDecodeError:
+            continue
+    return ""
+
+
+# --- 歌词仓库：按网易云歌曲 ID 索引，内容按哈希去重存放 ---
+class LyricStore:
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or os.path.join(get_app_data_dir(), "lyrics")
+        self.objects_dir = os.path.join(self.root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, "index.db"), timeout=10,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                song_id TEXT PRIMARY KEY,
+                lrc TEXT, tlyric TEXT, word TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS objects (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bindings (
+                path TEXT PRIMARY KEY,
+                song_id TEXT NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    # -- 内容对象 --
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _put_object(self, text):
+        if not text:
+            return None
+        data = text.encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._db.execute("INSERT OR IGNORE INTO objects (hash, size) VALUES (?, ?)", (digest, len(data)))
+        return digest
+
+    def _read_object(self, digest):
+        if not digest:
+            return ""
+        try:
+            with open(self._object_path(digest), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    # -- 读写 --
+    def get(self, song_id):
+        """返回 {'lrc', 'tlyric', 'word', 'fetched_at'}，不存在或文件丢失时返回 None"""
+        song_id = str(song_id)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT lrc, tlyric, word, fetched_at FROM entries WHERE song_id = ?",
+                (song_id,)).fetchone()
+            if row is None:
+                return None
+            result = {'fetched_at': row[3]}
+            for variant, digest in zip(VARIANTS, row[:3]):
+                text = self._read_object(digest)
+                if text is None:
+                    return None
+                result[variant] = text
+            self._db.execute("UPDATE entries SET last_access = ? WHERE song_id = ?",
+                             (time.time(), song_id))
+            self._db.commit()
+        return result
+
+    def contains(self, song_id):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM entries WHERE song_id = ?",
+                                    (str(song_id),)).fetchone() is not None
+
+    def put(self, song_id, lrc, tlyric="", word="", fetched_at=None):
+        now = time.time()
+        with self._lock:
+            digests = [self._put_object(text) for text in (lrc, tlyric, word)]
+            self._db.execute("""
+                INSERT OR REPLACE INTO entries (song_id, lrc, tlyric, word, fetched_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                (str(song_id), *digests, fetched_at or now, now))
+            self._db.commit()
+            self._evict_locked(keep=str(song_id))
+
+    # -- 绑定到歌曲文件 --
+    def bind(self, song_id, lrc_path):
+        """把仓库中的歌词写到 lrc_path（及翻译/逐字附属文件），不访问网络；没有缓存时返回 None"""
+        entry = self.get(song_id)
+        if entry is None:
+            return None
+        targets = (lrc_path,) + lyric_sidecar_paths(lrc_path)
+        for variant, target in zip(VARIANTS, targets):
+            if entry[variant]:
+                with open(target, 'w', encoding='utf-8') as f:
+                    f.write(entry[variant])
+            elif variant != 'lrc' and os.path.exists(target):
+                os.remove(target)  # 旧歌词留下的附属文件
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO bindings (path, song_id) VALUES (?, ?)",
+                             (os.path.abspath(lrc_path), str(song_id)))
+            self._db.commit()
+        return entry
+
+    def song_id_for_path(self, lrc_path):
+        with self._lock:
+            row = self._db.execute("SELECT song_id FROM bindings WHERE path = ?",
+                                   (os.path.abspath(lrc_path),)).fetchone()
+        return row[0] if row else None
+
+    # -- 批量导入 --
+    def import_lrc_files(self, paths):
+        """导入已有的 .lrc 文件；paths 可以包含目录。返回导入数量
+
+        歌曲 ID 依次取自 [id:]/[musicid:] 标签、纯数字文件名；都没有时按内容哈希生成本地 ID。
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, n) for n in names if n.lower().endswith(".lrc"))
+            elif path.lower().endswith(".lrc"):
+                files.append(path)
+
+        imported = 0
+        for lrc_path in files:
+            try:
+                lrc = _read_text(lrc_path)
+                if not lrc.strip():
+                    continue
+                tlyric_path, word_path = lyric_sidecar_paths(lrc_path)
+                tlyric = _read_text(tlyric_path) if os.path.exists(tlyric_path) else ""
+                word = _read_text(word_path) if os.path.exists(word_path) else ""
+
+                match = _ID_TAG_RE.search(lrc)
+                stem = os.path.splitext(os.path.basename(lrc_path))[0]
+                if match:
+                    song_id = match.group(1)
+                elif stem.isdigit():
+                    song_id = stem
+                else:
+                    song_id = self.song_id_for_path(lrc_path) or \
+                        "local:" + hashlib.sha1(lrc.encode('utf-8')).hexdigest()
+
+                self.put(song_id, lrc, tlyric, word, fetched_at=os.path.getmtime(lrc_path))
+                with self._lock:
+                    self._db.execute("INSERT OR REPLACE INTO bindings (path, song_id) VALUES (?, ?)",
+                                     (os.path.abspath(lrc_path), song_id))
+                    self._db.commit()
+                imported += 1
+            except OSError as e:
+                print(f"导入歌词失败: {lrc_path}: {e}")
+        return imported
+
+    # -- 容量控制 --
+    def total_size(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _evict_locked(self, keep=None):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰最久未访问的条目（刚写入的除外），直到降到上限的 90%
+        target = self.max_bytes * 0.9
+        while total > target:
+            rows = self._db.execute(
+                "SELECT song_id FROM entries WHERE song_id != ? ORDER BY last_access LIMIT 20",
+                (keep or "",)).fetchall()
+            if not rows:
+                break
+            self._db.executemany("DELETE FROM entries WHERE song_id = ?", rows)
+            total -= self._collect_garbage()
+        self._db.commit()
+
+    def _collect_garbage(self):
+        """删除不再被任何条目引用的内容对象，返回释放的字节数"""
+        orphans = self._db.execute("""
+            SELECT hash, size FROM objects WHERE hash NOT IN (
+                SELECT lrc FROM entries WHERE lrc IS NOT NULL
+                UNION SELECT tlyric FROM entries WHERE tlyric IS NOT NULL
+                UNION SELECT word FROM entries WHERE word IS NOT NULL)""").fetchall()
+        freed = 0
+        for digest, size in orphans:
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+            self._db.execute("DELETE FROM objects WHERE hash = ?", (digest,))
+            freed += size
+        return freed
+
+
+# --- 后台批量导入任务 ---
+class LyricImportWorker(Task):
+    lane = LANE_LYRICS
+    finished_signal = pyqtSignal(int)  # 导入数量
+
+    def __init__(self, paths, store=None):
+        super().__init__()
+        self.paths = paths
+        self.store = store
+
+    def run(self):
+        store = self.store or get_lyric_store()
+        self.finished_signal.emit(store.import_lrc_files(self.paths))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_lyric_store():
+    """全局共享的歌词仓库"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LyricStore()
+    return _store
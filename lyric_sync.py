@@ -0,0 +1,139 @@
+from PyQt5.QtCore import QObject, QTimer, QElapsedTimer, Qt, pyqtSignal
+from PyQt5.QtWidgets import QAbstractItemView
+
+from lrc_parser import LyricTimeline
+
+# 外部播放位置与内部时钟相差超过该值（毫秒）时才重新对齐
+DRIFT_TOLERANCE_MS = 80
+# 逐字高亮的刷新间隔（约 60 fps），只在有逐字时间的行播放期间运行
+SWEEP_INTERVAL_MS = 16
+
+# --- 歌词同步：只在下一行开始时触发一次定时器，不随播放进度轮询 ---
+class LyricSyncEngine(QObject):
+    line_changed = pyqtSignal(int)  # 当前行号（-1 表示第一行之前）
+    line_words_changed = pyqtSignal(int, object)  # 当前行号, LineWords 或 None
+    sweep_progress = pyqtSignal(int, int)  # 当前行号, 播放位置（毫秒）
+
+    def __init__(self, lyric_panel=None, desktop_lyric=None, parent=None):
+        super().__init__(parent)
+        self.lyric_panel = lyric_panel
+        self.desktop_lyric = desktop_lyric
+        self.timeline = LyricTimeline()
+        self.current_index = -1
+        self.playing = False
+
+        # 播放时钟：锚点位置 + 锚点之后经过的时间
+        self._anchor_ms = 0
+        self._clock = QElapsedTimer()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_boundary)
+
+        self._sweep_timer = QTimer(self)
+        self._sweep_timer.setInterval(SWEEP_INTERVAL_MS)
+        self._sweep_timer.setTimerType(Qt.PreciseTimer)
+        self._sweep_timer.timeout.connect(self._on_sweep)
+
+    # -- 播放状态 --
+    def position(self):
+        if self.playing and self._clock.isValid():
+            return self._anchor_ms + self._clock.elapsed()
+        return self._anchor_ms
+
+    def set_timeline(self, timeline):
+        self.timeline = timeline or LyricTimeline()
+        self.current_index = -2  # 强制刷新一次
+        self._reschedule()
+
+    def play(self, position_ms=None):
+        if position_ms is not None:
+            self._anchor_ms = position_ms
+        elif self.playing:
+            return
+        self._clock.restart()
+        self.playing = True
+        self._reschedule()
+
+    def pause(self, position_ms=None):
+        self._anchor_ms = self.position() if position_ms is None else position_ms
+        self.playing = False
+        self._timer.stop()
+        self._reschedule()
+
+    def seek(self, position_ms):
+        self._anchor_ms = position_ms
+        self._clock.restart()
+        self._reschedule()
+
+    def stop(self):
+        self.playing = False
+        self._anchor_ms = 0
+        self._timer.stop()
+        self._sweep_timer.stop()
+        self.set_timeline(None)
+
+    def sync(self, position_ms):
+        """播放器上报的位置；只有误差明显时才重新对齐，平时不做任何事"""
+        if abs(self.position() - position_ms) > DRIFT_TOLERANCE_MS:
+            self.seek(position_ms)
+
+    # -- 定时 --
+    def _on_boundary(self):
+        self._reschedule()
+
+    def _on_sweep(self):
+        words = self.timeline.line_words(self.current_index)
+        position = self.position()
+        self._push_sweep(position)
+        if words is None or position >= words.end_time:
+            self._sweep_timer.stop()
+
+    def _push_sweep(self, position):
+        if self.desktop_lyric is not None:
+            self.desktop_lyric.set_progress(position)
+        self.sweep_progress.emit(self.current_index, position)
+
+    def _update_sweep(self, position):
+        words = self.timeline.line_words(self.current_index)
+        if words is None:
+            self._sweep_timer.stop()
+            return
+        # 暂停或跳转后也要把高亮停在正确位置
+        self._push_sweep(position)
+        if self.playing and position < words.end_time:
+            if not self._sweep_timer.isActive():
+                self._sweep_timer.start()
+        else:
+            self._sweep_timer.stop()
+
+    def _reschedule(self):
+        self._timer.stop()
+        position = self.position()
+        index = self.timeline.index_at(position) if self.timeline else -1
+        if index != self.current_index:
+            self.current_index = index
+            self._apply_line(index)
+        self._update_sweep(position)
+
+        if not self.playing or not self.timeline:
+            return
+        next_time = self.timeline.next_time(index)
+        if next_time is not None:
+            # 定时器可能提前几毫秒触发，_reschedule 会重新计算并再次等待
+            self._timer.start(max(1, next_time - position))
+
+    def _apply_line(self, index):
+        if self.lyric_panel is not None and self.lyric_panel.count():
+            if index >= 0:
+                self.lyric_panel.setCurrentRow(index)
+                self.lyric_panel.scrollToItem(self.lyric_panel.item(index),
+                                              QAbstractItemView.PositionAtCenter)
+            else:
+                self.lyric_panel.clearSelection()
+        words = self.timeline.line_words(index)
+        if self.desktop_lyric is not None:
+            self.desktop_lyric.set_text(*self.timeline.context(index), words)
+        self.line_words_changed.emit(index, words)
+        self.line_changed.emit(index)
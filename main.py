@@ -1,14 +1,27 @@
 import sys
 import os
+import multiprocessing
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QFrame, QLabel, QPushButton, 
-                            QLineEdit, QTableWidget, QTableWidgetItem, QListWidget, 
+                            QLineEdit, QTableView, QHeaderView, QAbstractItemView, QListWidget, 
                             QListWidgetItem, QSlider, QVBoxLayout, QHBoxLayout, 
-                            QWidget, QSplitter, QScrollArea)
-from PyQt5.QtCore import Qt, QUrl, QSize
+                            QWidget, QSplitter, QScrollArea, QFileDialog)
+from PyQt5.QtCore import Qt, QUrl, QSize, QTimer
 from PyQt5.QtGui import QFont, QIcon, QColor, QPalette
 from theme_manager import ThemeManager
-from utils import LyricListSearchWorker
-from bilibili_downloader import BilibiliDownloader
+from download_manager import DownloadManager
+from download_view import DownloadManagerDialog
+from worker_host import get_worker_host, shutdown_worker_host
+from song_table_model import SongTableModel, SongActionDelegate
+from local_scanner import LocalMusicScanner
+from library_index import LibraryIndex
+from search_pager import OnlineSearchPager
+from task_executor import get_executor
+from utils import lyric_sidecar_paths
+from lrc_parser import LyricTimeline, load_lrc_file
+from lyric_sync import LyricSyncEngine
+from lyric_panel_delegate import LyricPanelDelegate
+from lyric_store import LyricImportWorker
+from lyric_matcher import BatchLyricMatcher
 
 # 屏幕缩放管理器（处理不同分辨率适配）
 class UIScaleManager:
@@ -44,12 +57,36 @@ class MusicPlayer(QMainWindow):
         self.theme_manager = ThemeManager()
         self.scale_manager = UIScaleManager()
         self.current_theme = self.theme_manager.get_theme()
+
+        # 本地音乐目录和扫描线程
+        self.music_folders = [os.path.join(os.path.expanduser("~"), "Music")]
+        self.scanner = None
+        self.lyric_matcher = None
+        self.library_index = LibraryIndex()
+        # 搜索时是否在本地结果之后合并网易云在线结果
+        self.online_search_enabled = True
+        self.search_pager = OnlineSearchPager(page_size=30, parent=self)
+        # 边输入边搜索：停止输入 150ms 后才真正发起搜索
+        self.search_generation = 0
+        self.last_search_keyword = None
+        self.search_debounce = QTimer(self)
+        self.search_debounce.setSingleShot(True)
+        self.search_debounce.setInterval(150)
+
+        # 下载队列：上次退出时未完成的任务在启动后继续
+        # 下载和转码在独立的工作进程中运行，避免 yt-dlp 占用 GIL 导致界面卡顿
+        self.download_manager = DownloadManager(parent=self, worker_host=get_worker_host())
+        self.download_dialog = None
+
+        # 当前歌曲的歌词时间轴
+        self.lyric_timeline = LyricTimeline()
         
         # 初始化UI
         self.init_ui()
         
         # 绑定信号与槽
         self.bind_signals()
+        self.download_manager.start_pending()
 
     def init_ui(self):
         # 窗口基本设置
@@ -80,11 +117,29 @@ class MusicPlayer(QMainWindow):
         self.search_box.setPlaceholderText("搜索歌曲、歌手...")
         content_layout.addWidget(self.search_box)
         
-        # 2.2 歌曲列表表格
-        self.song_table = QTableWidget()
+        # 2.2 歌曲列表表格（模型/视图，只绘制可见行）
+        self.song_model = SongTableModel(self)
+        self.song_table = QTableView()
         self.song_table.setObjectName("SongTable")
-        self.song_table.setColumnCount(4)
-        self.song_table.setHorizontalHeaderLabels(["歌曲", "歌手", "时长", "操作"])
+        self.song_table.setModel(self.song_model)
+        self.song_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.song_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.song_table.setMouseTracking(True)
+        self.song_table.setWordWrap(False)
+        self.song_table.verticalHeader().hide()
+        # 固定行高，避免按内容逐行测量
+        row_height = self.scale_manager.get_scaled_size(self.screen_width, self.screen_height, 50)
+        self.song_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.song_table.verticalHeader().setDefaultSectionSize(row_height)
+        header = self.song_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.Fixed)
+        header.setSectionResizeMode(SongTableModel.ACTION_COLUMN, QHeaderView.Fixed)
+        header.resizeSection(2, row_height * 2)
+        header.resizeSection(SongTableModel.ACTION_COLUMN, row_height * 2)
+        self.song_action_delegate = SongActionDelegate(self.current_theme, self.song_table)
+        self.song_table.setItemDelegateForColumn(SongTableModel.ACTION_COLUMN, self.song_action_delegate)
         content_layout.addWidget(self.song_table)
         
         main_layout.addWidget(content_area, 3)  # 占3份宽度
@@ -103,6 +158,13 @@ class MusicPlayer(QMainWindow):
         self.init_player_bar()
         content_layout.addWidget(self.player_bar)
 
+        # 歌词同步（歌词面板在 init_right_panel 中创建）
+        self.lyric_sync = LyricSyncEngine(lyric_panel=self.lyric_panel, parent=self)
+        self.lyric_panel_delegate = LyricPanelDelegate(self.lyric_panel, self.current_theme)
+        self.lyric_panel.setItemDelegate(self.lyric_panel_delegate)
+        self.lyric_sync.line_words_changed.connect(self.lyric_panel_delegate.set_line)
+        self.lyric_sync.sweep_progress.connect(self.lyric_panel_delegate.set_progress)
+
         # 应用样式表
         self.update_stylesheet()
 
@@ -136,14 +198,14 @@ class MusicPlayer(QMainWindow):
         # 工具按钮
         tool_buttons = [
             ("下载管理", "DownloadBtn"),
+            ("匹配歌词", "LyricMatchBtn"),
             ("设置", "SettingBtn")
         ]
         for text, obj_name in tool_buttons:
-            if obj_name == "DownloadBtn":
-                btn = QPushButton(text)
-                btn.setObjectName(obj_name)
-            else:
-                btn = QPushButton(text)
+            btn = QPushButton(text)
+            # 所有按钮都设置 objectName，init_connections 中用 findChild 查找
+            btn.setObjectName(obj_name)
+            if obj_name != "DownloadBtn":
                 btn.setProperty("class", "ToolBtn")
             sidebar_layout.addWidget(btn)
         
@@ -200,90 +262,228 @@ class MusicPlayer(QMainWindow):
         bar_layout.addWidget(self.vol_slider)
 
     def update_stylesheet(self):
-        """更新整个界面的样式表"""
+        """更新整个界面的样式表（切换主题后调用）"""
+        self.current_theme = self.theme_manager.get_theme()
         self.setStyleSheet(generate_stylesheet(
-            self.theme_manager.get_theme(),
+            self.current_theme,
             self.scale_manager,
             self.screen_width,
             self.screen_height
         ))
+        # 代理自己绘制，不受样式表影响，需要单独更新主题
+        self.song_action_delegate.set_theme(self.current_theme)
+        self.lyric_panel_delegate.set_theme(self.current_theme)
 
     def bind_signals(self):
         """绑定所有信号与槽函数"""
-        # 搜索框回车事件
+        # 搜索框：输入时防抖搜索，回车立即搜索
+        self.search_box.textChanged.connect(lambda _: self.search_debounce.start())
+        self.search_debounce.timeout.connect(self.search_as_you_type)
         self.search_box.returnPressed.connect(self.search_songs)
+
+        # 在线搜索分页：滚动接近底部时加载下一页
+        self.search_pager.page_ready.connect(self.merge_online_results)
+        self.song_table.verticalScrollBar().valueChanged.connect(self.on_song_table_scrolled)
         
-        # 下载按钮点击事件（示例）
+        # 下载管理按钮
         download_btn = self.findChild(QPushButton, "DownloadBtn")
         if download_btn:
             download_btn.clicked.connect(self.show_download_dialog)
         
+        # 为曲库中没有歌词的歌曲批量匹配歌词
+        match_btn = self.findChild(QPushButton, "LyricMatchBtn")
+        if match_btn:
+            match_btn.clicked.connect(self.match_library_lyrics)
+
+        # 本地音乐按钮点击事件
+        local_btn = self.findChild(QPushButton, "LocalBtn")
+        if local_btn:
+            local_btn.clicked.connect(self.show_local_music)
+
         # 播放按钮点击事件
         self.play_btn.clicked.connect(self.toggle_play)
 
+        # 拖动进度条后歌词立即跳到对应位置
+        self.progress_slider.sliderReleased.connect(
+            lambda: self.lyric_sync.seek(self.progress_slider.value()))
+
+        # 歌曲列表：操作列点击或双击行播放
+        self.song_action_delegate.action_clicked.connect(self.play_row)
+        self.song_table.doubleClicked.connect(lambda index: self.play_row(index.row()))
+
+    def search_as_you_type(self):
+        """防抖计时结束：关键词有变化才重新搜索"""
+        if self.search_box.text().strip() != self.last_search_keyword:
+            self.search_songs()
+
     def search_songs(self):
-        """搜索歌曲"""
+        """搜索歌曲：先查本地曲库索引，再合并在线结果"""
+        self.search_debounce.stop()
         keyword = self.search_box.text().strip()
+        self.last_search_keyword = keyword
         if not keyword:
+            self.search_pager.reset()
+            self.song_model.clear()
             return
-        
-        # 使用线程搜索歌词（来自utils.py）
-        self.search_worker = LyricListSearchWorker(keyword)
-        self.search_worker.search_finished.connect(self.update_song_table)
-        self.search_worker.start()
+
+        # 本地索引查询在毫秒级完成，直接在界面线程显示
+        self.update_song_table(self.library_index.search(keyword))
+        if not self.online_search_enabled:
+            self.search_pager.reset()
+            return
+
+        # 在线结果分页加载，第一页返回后追加到本地结果之后
+        # 每次搜索一个新的代号，旧请求的结果一律丢弃
+        self.search_generation = self.search_pager.start(keyword)
+
+    def on_song_table_scrolled(self, value):
+        """距离底部不足两屏时请求下一页"""
+        scroll_bar = self.song_table.verticalScrollBar()
+        if value >= scroll_bar.maximum() - scroll_bar.pageStep() * 2:
+            self.search_pager.request_more()
+
+    def merge_online_results(self, generation, results):
+        """把在线结果追加到本地结果之后，跳过本地已有的同名歌曲"""
+        if generation != self.search_generation:
+            return
+        local_keys = {(s['name'].lower(), s['artist'].lower())
+                      for s in self.song_model.songs() if s.get('source') == 'local'}
+        self.append_song_rows([s for s in results
+                               if (s['name'].lower(), s['artist'].lower()) not in local_keys])
+        # 结果还不够填满一屏时继续加载
+        QTimer.singleShot(0, lambda: self.on_song_table_scrolled(
+            self.song_table.verticalScrollBar().value()))
 
     def update_song_table(self, results):
         """更新歌曲列表表格"""
-        self.song_table.setRowCount(len(results))
-        for row, song in enumerate(results):
-            self.song_table.setItem(row, 0, QTableWidgetItem(song['name']))
-            self.song_table.setItem(row, 1, QTableWidgetItem(song['artist']))
-            self.song_table.setItem(row, 2, QTableWidgetItem(song['duration_str']))
-            
-            # 添加播放按钮
-            play_btn = QPushButton("播放")
-            play_btn.setProperty("class", "ActionBtn")
-            play_btn.clicked.connect(lambda checked, s=song: self.play_song(s))
-            self.song_table.setCellWidget(row, 3, play_btn)
+        self.song_table.scrollToTop()
+        self.song_model.set_songs(results)
+
+    def append_song_rows(self, songs):
+        """向歌曲列表追加一批歌曲（不重建已有行）"""
+        self.song_model.append_songs(songs)
+
+    def show_local_music(self):
+        """扫描本地音乐目录，结果分批显示到歌曲列表"""
+        folders = [f for f in self.music_folders if os.path.isdir(f)]
+        if not folders:
+            folder = QFileDialog.getExistingDirectory(self, "选择音乐目录", os.path.expanduser("~"))
+            if not folder:
+                return
+            self.music_folders = [folder]
+            folders = [folder]
+
+        if self.scanner and self.scanner.isRunning():
+            self.scanner.cancel()
+            self.scanner.wait()
+
+        self.search_pager.reset()
+        self.song_model.clear()
+        self.scanner = LocalMusicScanner(folders, index=self.library_index)
+        self.scanner.batch_ready.connect(self.append_song_rows)
+        self.scanner.progress_signal.connect(self.update_scan_progress)
+        self.scanner.finished_signal.connect(self.scan_finished)
+        self.scanner.error_signal.connect(self.show_error)
+        self.scanner.start()
+
+    def update_scan_progress(self, processed, found):
+        """更新扫描进度"""
+        self.statusBar().showMessage(f"正在扫描本地音乐: {processed}/{found}")
+
+    def scan_finished(self, total, updated):
+        """扫描完成回调"""
+        self.statusBar().showMessage(f"本地音乐 {total} 首（新读取 {updated} 首）", 5000)
+        # 有新文件时把音乐目录中已有的 .lrc 导入歌词仓库
+        if updated:
+            self.lyric_importer = LyricImportWorker(list(self.music_folders))
+            self.lyric_importer.start()
+
+    def match_library_lyrics(self):
+        """批量匹配歌词；再次点击停止（已处理的歌曲下次会跳过）"""
+        if self.lyric_matcher and self.lyric_matcher.isRunning():
+            self.lyric_matcher.cancel()
+            self.statusBar().showMessage("正在停止歌词匹配...")
+            return
+        self.lyric_matcher = BatchLyricMatcher(self.library_index.all_tracks())
+        self.lyric_matcher.progress_signal.connect(self.update_match_progress)
+        self.lyric_matcher.finished_signal.connect(self.lyric_match_finished)
+        self.lyric_matcher.start()
+
+    def update_match_progress(self, processed, total, per_minute):
+        self.statusBar().showMessage(f"正在匹配歌词: {processed}/{total}（{per_minute:.0f} 首/分钟）")
+
+    def lyric_match_finished(self, matched, processed):
+        self.statusBar().showMessage(f"歌词匹配完成：处理 {processed} 首，绑定 {matched} 首", 5000)
+
+    def play_row(self, row):
+        song = self.song_model.song_at(row)
+        if song:
+            self.play_song(song)
 
     def play_song(self, song):
         """播放歌曲（示例实现）"""
         self.play_btn.setText("⏸")
         print(f"播放: {song['name']} - {song['artist']}")
+        self.progress_slider.setRange(0, song.get('duration', 0))
+        self.progress_slider.setValue(0)
+        self.load_lyrics(song)
+        self.lyric_sync.play(0)
+
+    def load_lyrics(self, song):
+        """加载本地歌曲同名的 .lrc 歌词到歌词面板"""
+        timeline = LyricTimeline()
+        path = song.get('path')
+        if path:
+            lrc_path = os.path.splitext(path)[0] + ".lrc"
+            if os.path.exists(lrc_path):
+                trans_path, word_path = lyric_sidecar_paths(lrc_path)
+                try:
+                    timeline = load_lrc_file(
+                        lrc_path,
+                        trans_path if os.path.exists(trans_path) else None,
+                        word_path if os.path.exists(word_path) else None)
+                except OSError as e:
+                    print(f"歌词读取失败: {e}")
+        self.show_lyrics(timeline)
+
+    def show_lyrics(self, timeline):
+        """用歌词时间轴填充歌词面板（有翻译时显示在原文下方）"""
+        self.lyric_timeline = timeline
+        self.lyric_panel.clear()
+        for i, line in enumerate(timeline.lines):
+            translation = timeline.translation(i)
+            self.lyric_panel.addItem(f"{line}\n{translation}" if translation else line)
+        self.lyric_sync.set_timeline(timeline)
 
     def toggle_play(self):
         """切换播放/暂停状态"""
         if self.play_btn.text() == "▶":
             self.play_btn.setText("⏸")
             print("继续播放")
+            self.lyric_sync.play()
         else:
             self.play_btn.setText("▶")
             print("暂停播放")
+            self.lyric_sync.pause()
 
     def show_download_dialog(self):
-        """显示下载对话框（示例）"""
-        url = "https://www.bilibili.com/video/BV1xx411c7mG"  # 示例URL
-        save_path = os.path.join(os.path.expanduser("~"), "Music")
-        
-        # 创建下载线程（来自bilibili_downloader.py）
-        self.downloader = BilibiliDownloader(url, save_path, 'single', 1)
-        self.downloader.progress_signal.connect(self.update_download_progress)
-        self.downloader.finished_signal.connect(self.download_finished)
-        self.downloader.error_signal.connect(self.show_error)
-        self.downloader.start()
-
-    def update_download_progress(self, msg):
-        """更新下载进度"""
-        print(f"下载进度: {msg}")
-
-    def download_finished(self, path, filename):
-        """下载完成回调"""
-        print(f"下载完成，保存至: {path}")
+        """显示下载管理窗口（非模态，关闭后队列继续在后台下载）"""
+        if self.download_dialog is None:
+            self.download_dialog = DownloadManagerDialog(self.download_manager, self)
+        self.download_dialog.show()
+        self.download_dialog.raise_()
 
     def show_error(self, msg):
         """显示错误信息"""
         print(f"错误: {msg}")
 
+    def closeEvent(self, event):
+        """关闭窗口时取消后台任务（下载任务保留在队列中，下次启动续传）"""
+        self.download_manager.shutdown()
+        shutdown_worker_host()
+        get_executor().shutdown()
+        super().closeEvent(event)
+
 # 样式表生成函数（来自之前的代码片段）
 def generate_stylesheet(theme, scale_manager=None, screen_width=1920, screen_height=1080):
     if scale_manager is None:
@@ -429,7 +629,7 @@ QHeaderView::section {{
     min-height: {table_row_height}px; 
 }}
 
-QTableWidget {{ 
+QTableView {{ 
     background-color: transparent;
     border: none;
     outline: none;
@@ -440,18 +640,18 @@ QTableWidget {{
     font-size: {font_size}px; 
 }}
 
-QTableWidget::item {{ 
+QTableView::item {{ 
     padding: {padding}px;
     border-bottom: 1px solid {theme['border']};
     color: {theme['text_primary']};
     min-height: {table_row_height}px; 
 }}
 
-QTableWidget::item:hover {{ 
+QTableView::item:hover {{ 
     background-color: {theme['hover']};
 }}
 
-QTableWidget::item:selected {{ 
+QTableView::item:selected {{ 
     background-color: {theme['selected']};
     color: {theme['primary']};
     border-radius: 6px; 
@@ -673,6 +873,8 @@ QPushButton.LyricControlBtn:hover {{
 """
 
 if __name__ == "__main__":
+    # 打包后的程序启动下载工作进程时需要
+    multiprocessing.freeze_support()
     # 确保中文显示正常
     font = QFont("SimHei")
     app = QApplication(sys.argv)
@@ -0,0 +1,135 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# 自动绑定需要达到的最低匹配分数（0~1）
+DEFAULT_THRESHOLD = 0.75
+# 各项得分的权重
+TITLE_WEIGHT = 0.45
+ARTIST_WEIGHT = 0.25
+DURATION_WEIGHT = 0.3
+# 候选是现场版、混音、伴奏等而本地歌曲不是时扣的分
+PENALTY_WEIGHT = 0.3
+# 时长相差超过该值（毫秒）时时长得分为 0
+DURATION_TOLERANCE_MS = 10000
+
+# 版本标记：在标题（含括号部分）中出现时视为非原版
+VERSION_FLAGS = ('live', '现场', 'remix', '伴奏', 'instrumental', 'karaoke', '纯音乐', 'cover', '翻唱')
+
+_BRACKET_RE = re.compile(r'[(\[（【《].*?[)\]）】》]')
+_NON_WORD_RE = re.compile(r'[\W_]+')
+_ARTIST_SPLIT_RE = re.compile(r'\s*(?:/|,|，|&|、|;|；|\bfeat\.?|\bft\.?)\s*', re.IGNORECASE)
+
+# -- 文本规整 --
+def fold_text(text):
+    """全角转半角、转小写"""
+    return unicodedata.normalize('NFKC', text or "").lower()
+
+def normalize_text(text):
+    """在 fold_text 的基础上去掉括号里的附加信息和标点空白"""
+    return _NON_WORD_RE.sub("", _BRACKET_RE.sub(" ", fold_text(text)))
+
+def split_artists(text):
+    if not text or text == "未知":
+        return set()
+    return {a for a in (normalize_text(part) for part in _ARTIST_SPLIT_RE.split(text)) if a}
+
+
+# -- 各项得分（每项一次处理全部候选） --
+def _encode(texts):
+    """把字符串编码为补齐的码点矩阵，返回 (矩阵, 长度)"""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int32, count=len(texts))
+    width = int(lengths.max()) if len(texts) else 0
+    codes = np.full((len(texts), width), -1, dtype=np.int32)
+    for row, text in enumerate(texts):
+        if text:
+            codes[row, :len(text)] = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return codes, lengths
+
+def title_similarity(query, titles):
+    """1 - 归一化编辑距离
+
+    按查询串逐字推进 Levenshtein 动态规划，每一步同时更新所有候选的整行；
+    行内的插入操作用 “j + 前缀最小值(E - j)” 求出，不需要逐格循环。
+    """
+    query = normalize_text(query)
+    codes, lengths = _encode([normalize_text(t) for t in titles])
+    count, width = codes.shape
+    columns = np.arange(width + 1, dtype=np.int32)
+    row = np.tile(columns, (count, 1))
+    for i, char in enumerate(query, 1):
+        cost = (codes != ord(char)).astype(np.int32)
+        best = np.minimum(row[:, :-1] + cost, row[:, 1:] + 1)
+        best = np.concatenate((np.full((count, 1), i, dtype=np.int32), best), axis=1)
+        row = np.minimum.accumulate(best - columns, axis=1) + columns
+    distance = row[np.arange(count), lengths]
+    longest = np.maximum(lengths, len(query))
+    similarity = 1.0 - distance / np.maximum(longest, 1)
+    # 任一方为空时没有可比性
+    similarity[(lengths == 0) | (len(query) == 0)] = 0.0
+    return similarity
+
+def artist_similarity(query, artists):
+    """有共同歌手时为 1，没有为 0；任一方未知时给中间分"""
+    wanted = split_artists(query)
+    scores = np.full(len(artists), 0.5)
+    if not wanted:
+        return scores
+    owners = []
+    names = []
+    for i, artist in enumerate(artists):
+        parts = split_artists(artist)
+        owners.extend([i] * len(parts))
+        names.extend(parts)
+    known = np.bincount(np.asarray(owners, dtype=np.intp), minlength=len(artists)) > 0
+    hits = np.bincount(np.asarray(owners, dtype=np.intp),
+                       weights=np.isin(np.asarray(names, dtype=object), list(wanted)),
+                       minlength=len(artists))
+    scores[known] = (hits[known] > 0).astype(float)
+    return scores
+
+def duration_similarity(query_ms, durations):
+    durations = np.asarray(durations, dtype=float)
+    if not query_ms:
+        return np.full(len(durations), 0.5)
+    scores = np.clip(1.0 - np.abs(durations - query_ms) / DURATION_TOLERANCE_MS, 0.0, 1.0)
+    scores[durations <= 0] = 0.5
+    return scores
+
+def version_penalty(query, titles):
+    """候选带有本地标题中没有的版本标记时返回 1"""
+    query = fold_text(query)
+    folded = np.array([fold_text(t) for t in titles], dtype=str)
+    penalty = np.zeros(len(titles), dtype=bool)
+    for flag in VERSION_FLAGS:
+        if flag not in query:
+            penalty |= np.char.find(folded, flag) >= 0
+    return penalty.astype(float)
+
+
+# --- 候选排序 ---
+def score_candidates(track, candidates):
+    """本地歌曲（或搜索关键词）与一批在线结果的匹配分数，返回 0~1 的数组"""
+    if not candidates:
+        return np.zeros(0)
+    titles = [c.get('name', "") for c in candidates]
+    scores = (TITLE_WEIGHT * title_similarity(track.get('name'), titles)
+              + ARTIST_WEIGHT * artist_similarity(track.get('artist'), [c.get('artist', "") for c in candidates])
+              + DURATION_WEIGHT * duration_similarity(track.get('duration'), [c.get('duration') or 0 for c in candidates])
+              - PENALTY_WEIGHT * version_penalty(track.get('name'), titles))
+    return np.clip(scores, 0.0, 1.0)
+
+def rank_candidates(track, candidates):
+    """按分数从高到低排序，返回 [(候选, 分数)]；分数相同时保持原来的顺序"""
+    scores = score_candidates(track, candidates)
+    order = np.argsort(-scores, kind='stable')
+    return [(candidates[i], float(scores[i])) for i in order]
+
+def best_candidate(track, candidates):
+    """返回 (最佳结果, 分数)；没有结果时为 (None, 0.0)"""
+    if not candidates:
+        return None, 0.0
+    scores = score_candidates(track, candidates)
+    best = int(np.argmax(scores))
+    return candidates[best], float(scores[best])
@@ -0,0 +1,117 @@
+import os
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# 各输出格式的 ffmpeg 音频参数；m4a 只换封装，不转码
+AUDIO_CODEC_ARGS = {
+    'm4a': ['-c:a', 'copy'],
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '192k'],
+    'opus': ['-c:a', 'libopus', '-b:a', '128k'],
+}
+
+
+class PostProcessError(Exception):
+    pass
+
+
+# -- ffmpeg 调用 --
+def find_ffmpeg():
+    return shutil.which("ffmpeg")
+
+def output_path_for(src, output_format):
+    return os.path.splitext(src)[0] + "." + output_format
+
+def needs_processing(src, output_format):
+    """已经是目标封装的 m4a 不需要处理；转码格式总是需要"""
+    if output_format not in AUDIO_CODEC_ARGS:
+        return False
+    return os.path.splitext(src)[1].lower() != "." + output_format
+
+def build_ffmpeg_command(ffmpeg, src, dst, output_format):
+    return [ffmpeg, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y',
+            '-i', src, '-vn', '-map_metadata', '0', *AUDIO_CODEC_ARGS[output_format], dst]
+
+def run_to_file(make_command, dst, token=None):
+    """运行 make_command(临时文件) 返回的 ffmpeg 命令，成功后把临时文件改名为 dst"""
+    tmp_dst = dst + ".tmp" + os.path.splitext(dst)[1]
+    proc = subprocess.Popen(make_command(tmp_dst), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        while True:
+            try:
+                _, stderr = proc.communicate(timeout=0.2)
+                break
+            except subprocess.TimeoutExpired:
+                if token is not None and token.is_canceled:
+                    proc.kill()
+                    proc.communicate()
+                    raise PostProcessError("已取消")
+        if proc.returncode != 0:
+            message = stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise PostProcessError(message[-1] if message else f"ffmpeg 退出码 {proc.returncode}")
+        os.replace(tmp_dst, dst)
+    finally:
+        if os.path.exists(tmp_dst):
+            os.remove(tmp_dst)
+    return dst
+
+def run_ffmpeg(src, output_format, token=None, keep_source=False, ffmpeg=None):
+    """把 src 处理成 output_format，返回输出文件路径；token 被取消时终止 ffmpeg"""
+    dst = output_path_for(src, output_format)
+    # 重复下载或输出文件名相同时目标已存在，不再转换，但同样清理源文件
+    if not os.path.exists(dst):
+        ffmpeg = ffmpeg or find_ffmpeg()
+        if not ffmpeg:
+            raise PostProcessError("未找到 ffmpeg，无法转换音频格式")
+        run_to_file(lambda tmp: build_ffmpeg_command(ffmpeg, src, tmp, output_format), dst, token)
+    if not keep_source and os.path.exists(src):
+        os.remove(src)
+    return dst
+
+
+# --- 后处理池：下载完成的文件在这里转码/换封装，下载线程不用等待 ---
+class PostProcessPool:
+    def __init__(self, max_workers=None):
+        # 每个工作线程驱动一个 ffmpeg 进程，数量与 CPU 核数相同
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="postprocess")
+
+    def submit(self, src, output_format, token=None, keep_source=False, callback=None):
+        """返回 Future，结果为输出文件路径
+
+        callback(输出路径, 异常) 在工作线程中、Future 完成之前调用，
+        等待 Future 的一方可以确定回调已经执行完。
+        """
+        return self.submit_call(run_ffmpeg, src, output_format, token, keep_source, callback=callback)
+
+    def submit_call(self, fn, *args, callback=None):
+        """在池中运行 fn(*args)（通常是一次 ffmpeg 调用），回调约定同 submit"""
+        def job():
+            try:
+                result = fn(*args)
+            except Exception as e:
+                if callback is not None:
+                    callback(None, e)
+                raise
+            if callback is not None:
+                callback(result, None)
+            return result
+        return self._executor.submit(job)
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_postprocess_pool():
+    """全局共享的后处理池，所有下载任务共用，同时运行的 ffmpeg 不超过 CPU 核数"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PostProcessPool()
+    return _pool
@@ -0,0 +1,102 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- 搜索结果缓存：内存 LRU + TTL，可选磁盘二级缓存 ---
+# 值以 JSON 文本保存，每次 get() 都返回新的对象，调用方修改结果不会影响缓存
+class SearchCache:
+    def __init__(self, max_entries=256, ttl=600, disk_path=None, disk_ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # 磁盘缓存默认与内存缓存同样过期，重启后也不会返回更旧的结果
+        self.disk_ttl = ttl if disk_ttl is None else disk_ttl
+        self._entries = OrderedDict()  # key -> (过期时间, JSON 文本)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk = None
+        if disk_path:
+            try:
+                self._disk = sqlite3.connect(disk_path, timeout=5, check_same_thread=False)
+                self._disk.execute("PRAGMA journal_mode=WAL")
+                self._disk.execute("""
+                    CREATE TABLE IF NOT EXISTS search_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires REAL NOT NULL
+                    )""")
+                self._disk.execute("DELETE FROM search_cache WHERE expires < ?", (time.time(),))
+                self._disk.commit()
+            except sqlite3.Error as e:
+                print(f"磁盘缓存不可用: {e}")
+                self._disk = None
+
+    @staticmethod
+    def make_key(keyword, search_type, offset, limit):
+        return (keyword.strip().lower(), search_type, offset, limit)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                expires, text = item
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(text)
+                del self._entries[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expires FROM search_cache WHERE key = ?",
+                    (json.dumps(key, ensure_ascii=False),)).fetchone()
+                if row and row[1] > now:
+                    self._put_memory(key, row[0], now)
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        text = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._put_memory(key, text, now)
+            if self._disk is not None:
+                try:
+                    self._disk.execute(
+                        "INSERT OR REPLACE INTO search_cache (key, value, expires) VALUES (?, ?, ?)",
+                        (json.dumps(key, ensure_ascii=False), text, now + self.disk_ttl))
+                    self._disk.commit()
+                except sqlite3.Error as e:
+                    print(f"写入磁盘缓存失败: {e}")
+
+    def _put_memory(self, key, text, now):
+        self._entries[key] = (now + self.ttl, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM search_cache")
+                self._disk.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': (self.hits + self.disk_hits) / total if total else 0.0,
+            }
@@ -0,0 +1,102 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils import SearchPageWorker
+
+# --- 在线搜索分页：滚动到底部时显示下一页，并提前预取一页 ---
+class OnlineSearchPager(QObject):
+    page_ready = pyqtSignal(int, list)   # 搜索代号, 新显示的一页歌曲
+    loading_changed = pyqtSignal(bool)
+
+    def __init__(self, page_size=30, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.keyword = ""
+        self.generation = 0
+        self.pages = {}        # 页码 -> 歌曲列表（已取回的页，往回滚动或重复请求时直接复用）
+        self.total = None
+        self.shown_pages = 0
+        self._inflight = set()
+        self._want_next = False
+        self._workers = []
+
+    def start(self, keyword):
+        """开始新的搜索并返回它的代号，旧搜索尚未返回的结果会被丢弃"""
+        self.reset()
+        self.keyword = keyword
+        self.request_more()
+        return self.generation
+
+    def reset(self):
+        """停止分页（例如切换到本地音乐列表时）"""
+        self.generation += 1
+        # 旧关键词的请求：还没开始的直接跳过，已在进行的结果丢弃
+        for worker in self._workers:
+            worker.cancel()
+        self.keyword = ""
+        self.pages = {}
+        self.total = None
+        self.shown_pages = 0
+        self._inflight = set()
+        if self._want_next:
+            self._want_next = False
+            self.loading_changed.emit(False)
+
+    def has_more(self):
+        return self.total is None or self.shown_pages * self.page_size < self.total
+
+    def is_loading(self):
+        return self._want_next and bool(self._inflight)
+
+    def request_more(self):
+        """视图接近底部时调用：有预取好的页就立即显示，否则请求它"""
+        if not self.keyword or not self.has_more():
+            return
+        page = self.shown_pages
+        if page in self.pages:
+            self._show_next()
+        else:
+            self._want_next = True
+            self.loading_changed.emit(True)
+            self._fetch(page)
+
+    def _fetch(self, page):
+        if page in self.pages or page in self._inflight:
+            return
+        if self.total is not None and page * self.page_size >= self.total:
+            return
+        self._inflight.add(page)
+        worker = SearchPageWorker(self.keyword, page, self.page_size)
+        generation = self.generation
+        worker.page_finished.connect(
+            lambda p, data, g=generation: self._on_page_finished(g, p, data))
+        worker.finished.connect(lambda w=worker: self._workers.remove(w))
+        self._workers.append(worker)
+        worker.start()
+
+    def _on_page_finished(self, generation, page, data):
+        if generation != self.generation:
+            return  # 旧关键词的结果
+        self._inflight.discard(page)
+        if data is None:
+            if page == self.shown_pages and self._want_next:
+                self._want_next = False
+                self.loading_changed.emit(False)
+            return
+        self.pages[page] = data['songs']
+        self.total = data['total']
+        if not data['songs']:
+            # 服务端没有更多结果，以实际数量为准
+            self.total = min(self.total, page * self.page_size)
+        if page == self.shown_pages and self._want_next:
+            self._show_next()
+
+    def _show_next(self):
+        page = self.shown_pages
+        songs = self.pages[page]
+        self.shown_pages += 1
+        if self._want_next:
+            self._want_next = False
+            self.loading_changed.emit(False)
+        self.page_ready.emit(self.generation, songs)
+        # 预取下一页，用户滚到底部时可以立即显示
+        self._fetch(self.shown_pages)
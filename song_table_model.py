@@ -0,0 +1,190 @@
+from collections import deque
+
+from PyQt5.QtCore import (Qt, QAbstractTableModel, QModelIndex, QEvent,
+                          QTimer, pyqtSignal)
+from PyQt5.QtGui import QColor, QPen, QPainter
+from PyQt5.QtWidgets import QStyledItemDelegate, QAbstractItemView
+
+# --- 歌曲列表模型（只保存数据，视图按需绘制可见行） ---
+class SongTableModel(QAbstractTableModel):
+    HEADERS = ["歌曲", "歌手", "时长", "操作"]
+    ACTION_COLUMN = 3
+    SongRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None, batch_size=500):
+        super().__init__(parent)
+        self._songs = []
+        # 分批追加：大结果集每个事件循环只插入 batch_size 行，界面保持响应
+        self.batch_size = batch_size
+        self._pending = deque()
+        self._batch_timer = QTimer(self)
+        self._batch_timer.setInterval(0)
+        self._batch_timer.timeout.connect(self._flush_batch)
+
+    # -- Qt 模型接口 --
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._songs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        song = self._songs[index.row()]
+        column = index.column()
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            if column == 0:
+                return song.get('name', '')
+            if column == 1:
+                return song.get('artist', '')
+            if column == 2 and role == Qt.DisplayRole:
+                return song.get('duration_str', '')
+            if column == self.ACTION_COLUMN and role == Qt.DisplayRole:
+                return "播放"
+        elif role == Qt.TextAlignmentRole and column >= 2:
+            return Qt.AlignCenter
+        elif role == self.SongRole:
+            return song
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    # -- 数据操作 --
+    def song_at(self, row):
+        if 0 <= row < len(self._songs):
+            return self._songs[row]
+        return None
+
+    def songs(self):
+        return list(self._songs)
+
+    def clear(self):
+        self._pending.clear()
+        self._batch_timer.stop()
+        self.beginResetModel()
+        self._songs = []
+        self.endResetModel()
+
+    def set_songs(self, songs):
+        """替换全部数据（超过一批的部分会分批追加）"""
+        self.clear()
+        self.append_songs(songs)
+
+    def append_songs(self, songs):
+        """追加歌曲，不重建已有行"""
+        if not songs:
+            return
+        self._pending.extend(songs)
+        if len(self._pending) <= self.batch_size and not self._batch_timer.isActive():
+            self._flush_batch()
+        else:
+            self._batch_timer.start()
+
+    def _flush_batch(self):
+        count = min(self.batch_size, len(self._pending))
+        if count:
+            first = len(self._songs)
+            self.beginInsertRows(QModelIndex(), first, first + count - 1)
+            for _ in range(count):
+                self._songs.append(self._pending.popleft())
+            self.endInsertRows()
+        if not self._pending:
+            self._batch_timer.stop()
+
+
+# --- “播放”操作列代理：绘制按钮并做点击检测，不创建真实控件 ---
+class SongActionDelegate(QStyledItemDelegate):
+    action_clicked = pyqtSignal(int)  # 行号
+
+    def __init__(self, theme, parent=None):
+        super().__init__(parent)
+        self.theme = theme
+        self._hover_row = -1
+        self._pressed_row = -1
+        # 鼠标离开表格时 editorEvent 收不到事件，通过事件过滤器清除悬停状态
+        self._view = parent if isinstance(parent, QAbstractItemView) else None
+        if self._view is not None:
+            self._view.viewport().installEventFilter(self)
+
+    def set_theme(self, theme):
+        self.theme = theme
+        if self._view is not None:
+            self._view.viewport().update()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Leave and self._view is not None and obj is self._view.viewport():
+            self.clear_hover()
+        return super().eventFilter(obj, event)
+
+    def button_rect(self, cell_rect):
+        margin_x = max(4, cell_rect.width() // 6)
+        margin_y = max(3, cell_rect.height() // 5)
+        return cell_rect.adjusted(margin_x, margin_y, -margin_x, -margin_y)
+
+    def paint(self, painter, option, index):
+        rect = self.button_rect(option.rect)
+        hovered = index.row() == self._hover_row
+        pressed = index.row() == self._pressed_row
+        accent = QColor(self.theme['primary'])
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        if hovered or pressed:
+            fill = QColor(accent)
+            fill.setAlpha(40 if pressed else 20)
+            painter.setBrush(fill)
+        else:
+            painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(accent if hovered else QColor(self.theme['border']), 1))
+        painter.drawRoundedRect(rect, 8, 8)
+
+        painter.setPen(accent if hovered else QColor(self.theme['text_secondary']))
+        painter.setFont(option.font)
+        painter.drawText(rect, Qt.AlignCenter, index.data(Qt.DisplayRole) or "")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        event_type = event.type()
+        if event_type not in (QEvent.MouseMove, QEvent.MouseButtonPress,
+                              QEvent.MouseButtonRelease, QEvent.MouseButtonDblClick):
+            return False
+
+        inside = self.button_rect(option.rect).contains(event.pos())
+        row = index.row() if inside else -1
+        if event_type == QEvent.MouseMove:
+            if row != self._hover_row:
+                self._hover_row = row
+                self._repaint(option)
+            return False
+        if event.button() != Qt.LeftButton:
+            return False
+        if event_type == QEvent.MouseButtonPress and inside:
+            self._pressed_row = row
+            self._repaint(option)
+            return True
+        if event_type == QEvent.MouseButtonRelease:
+            clicked = inside and self._pressed_row == row
+            self._pressed_row = -1
+            self._repaint(option)
+            if clicked:
+                self.action_clicked.emit(row)
+            return clicked
+        return inside
+
+    def clear_hover(self):
+        if self._hover_row == -1 and self._pressed_row == -1:
+            return
+        self._hover_row = -1
+        self._pressed_row = -1
+        if self._view is not None:
+            self._view.viewport().update()
+
+    def _repaint(self, option):
+        # 视图只会重绘可见行，代价与总行数无关
+        widget = option.widget
+        if widget is not None:
+            widget.viewport().update()
@@ -132,7 +132,7 @@ QHeaderView::section {{
     min-height: {table_row_height}px; 
 }}
 
-QTableWidget {{ 
+QTableView {{ 
     background-color: transparent;
     border: 1px solid {theme['border']};
     border-radius: 12px;
@@ -140,7 +140,7 @@ QTableWidget {{
     padding: {padding}px;  /* 内部边距 */
 }}
 
-QTableWidget::item {{ 
+QTableView::item {{ 
     padding: {padding}px;
     border-bottom: 1px solid {theme['border']};
     color: {theme['text_primary']};
@@ -0,0 +1,164 @@
+import threading
+from PyQt5.QtCore import QObject, QRunnable, QThread, QThreadPool, pyqtSignal
+
+# 任务通道：交互搜索 > 曲库扫描 > 歌词 > 下载
+LANE_INTERACTIVE = 'interactive'
+LANE_LIBRARY = 'library'
+LANE_LYRICS = 'lyrics'
+LANE_DOWNLOAD = 'download'
+
+# 每个通道的最大并发数；通道之间互不占用线程，后台任务再多也不会挡住搜索
+DEFAULT_LANE_LIMITS = {
+    LANE_INTERACTIVE: 4,
+    LANE_LIBRARY: 1,
+    LANE_LYRICS: 4,
+    LANE_DOWNLOAD: 2,
+}
+
+# 通道内的默认排队优先级（数值越大越先执行）和线程优先级
+LANE_PRIORITY = {
+    LANE_INTERACTIVE: 10,
+    LANE_LIBRARY: 5,
+    LANE_LYRICS: 5,
+    LANE_DOWNLOAD: 0,
+}
+LANE_THREAD_PRIORITY = {
+    LANE_INTERACTIVE: QThread.NormalPriority,
+    LANE_LIBRARY: QThread.LowPriority,
+    LANE_LYRICS: QThread.LowPriority,
+    LANE_DOWNLOAD: QThread.LowPriority,
+}
+
+
+class TaskCanceled(Exception):
+    pass
+
+
+# --- 取消令牌 ---
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def is_canceled(self):
+        return self._event.is_set()
+
+    def raise_if_canceled(self):
+        if self._event.is_set():
+            raise TaskCanceled()
+
+
+# --- 任务基类：子类实现 run()，通过自身的信号把结果送回界面线程 ---
+class Task(QObject):
+    lane = LANE_INTERACTIVE
+    priority = None  # None 表示使用通道默认优先级
+
+    finished = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.token = CancelToken()
+        self._started = False
+        self._done = threading.Event()
+
+    @property
+    def is_canceled(self):
+        return self.token.is_canceled
+
+    def run(self):
+        raise NotImplementedError
+
+    def start(self, executor=None):
+        """提交到共享执行器（保留 QThread 风格的调用方式）"""
+        self._started = True
+        (executor or get_executor()).submit(self)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def isRunning(self):
+        return self._started and not self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _execute(self):
+        try:
+            if not self.token.is_canceled:
+                self.run()
+        except TaskCanceled:
+            pass
+        except Exception as e:
+            print(f"任务执行错误 ({type(self).__name__}): {e}")
+        finally:
+            self._done.set()
+            self.finished.emit()
+
+
+class _TaskRunnable(QRunnable):
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+        self.setAutoDelete(True)
+
+    def run(self):
+        QThread.currentThread().setPriority(LANE_THREAD_PRIORITY.get(self.task.lane, QThread.NormalPriority))
+        self.task._execute()
+
+
+# --- 按通道划分的线程池执行器 ---
+class TaskExecutor:
+    def __init__(self, lane_limits=None):
+        self.pools = {}
+        self._tasks = set()  # 持有排队/运行中的任务，避免被提前回收
+        self._lock = threading.Lock()
+        for lane, limit in (lane_limits or DEFAULT_LANE_LIMITS).items():
+            pool = QThreadPool()
+            pool.setMaxThreadCount(limit)
+            self.pools[lane] = pool
+
+    def submit(self, task, priority=None):
+        pool = self.pools.get(task.lane) or self.pools[LANE_INTERACTIVE]
+        if priority is None:
+            priority = task.priority if task.priority is not None else LANE_PRIORITY.get(task.lane, 0)
+        with self._lock:
+            self._tasks.add(task)
+        task.finished.connect(lambda t=task: self._forget(t))
+        pool.start(_TaskRunnable(task), priority)
+        return task
+
+    def _forget(self, task):
+        with self._lock:
+            self._tasks.discard(task)
+
+    def set_lane_limit(self, lane, limit):
+        self.pools[lane].setMaxThreadCount(max(1, limit))
+
+    def active_count(self, lane):
+        return self.pools[lane].activeThreadCount()
+
+    def cancel_all(self, lane=None):
+        with self._lock:
+            tasks = list(self._tasks)
+        for task in tasks:
+            if lane is None or task.lane == lane:
+                task.cancel()
+
+    def shutdown(self, timeout_ms=3000):
+        self.cancel_all()
+        for pool in self.pools.values():
+            pool.clear()
+            pool.waitForDone(timeout_ms)
+
+
+_executor = None
+
+def get_executor():
+    """全局共享的任务执行器（只在界面线程中首次创建）"""
+    global _executor
+    if _executor is None:
+        _executor = TaskExecutor()
+    return _executor
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("PyQt5.QtCore")
+
+from library_index import LibraryIndex
+from local_scanner import LocalMusicScanner
+
+
+def make_files(folder, *names):
+    os.makedirs(folder, exist_ok=True)
+    for name in names:
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(b"\0" * 16)
+
+
+def scan(index, *folders):
+    scanner = LocalMusicScanner(list(folders), index=index, max_workers=2)
+    scanner.run()
+
+
+def indexed_paths(index):
+    return sorted(song['path'] for song in index.all_tracks())
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LibraryIndex(path=str(tmp_path / "library.db"))
+    yield index
+    index.close()
+
+
+def test_scanning_another_folder_keeps_existing_tracks(tmp_path, index):
+    folder_a = str(tmp_path / "a")
+    folder_b = str(tmp_path / "b")
+    make_files(folder_a, "歌手 - 一.mp3", "歌手 - 二.mp3")
+    make_files(folder_b, "歌手 - 三.mp3")
+
+    scan(index, folder_a)
+    scan(index, folder_b)
+
+    assert indexed_paths(index) == sorted([
+        os.path.join(folder_a, "歌手 - 一.mp3"),
+        os.path.join(folder_a, "歌手 - 二.mp3"),
+        os.path.join(folder_b, "歌手 - 三.mp3"),
+    ])
+
+
+def test_removed_files_are_pruned_only_under_scanned_roots(tmp_path, index):
+    folder = str(tmp_path / "music")
+    sibling = str(tmp_path / "music2")
+    make_files(folder, "a.mp3", "b.mp3")
+    make_files(sibling, "c.mp3")
+    scan(index, folder, sibling)
+
+    os.remove(os.path.join(folder, "b.mp3"))
+    scan(index, folder)
+
+    # /music 的前缀不能匹配到 /music2
+    assert indexed_paths(index) == sorted([
+        os.path.join(folder, "a.mp3"),
+        os.path.join(sibling, "c.mp3"),
+    ])
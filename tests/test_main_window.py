@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def window(app, tmp_path, monkeypatch):
+    # 数据库等都写到临时目录
+    monkeypatch.setenv("HOME", str(tmp_path))
+    import main
+    calls = []
+    monkeypatch.setattr(main.MusicPlayer, "match_library_lyrics",
+                        lambda self, *args: calls.append("match"))
+    monkeypatch.setattr(main.MusicPlayer, "show_download_dialog",
+                        lambda self, *args: calls.append("download"))
+    player = main.MusicPlayer()
+    player.calls = calls
+    yield player
+    player.close()
+
+
+def test_tool_buttons_have_object_names(window):
+    for name in ("DownloadBtn", "LyricMatchBtn", "SettingBtn"):
+        assert window.findChild(QtWidgets.QPushButton, name) is not None, name
+    match_btn = window.findChild(QtWidgets.QPushButton, "LyricMatchBtn")
+    # 样式表按 class 选择工具按钮
+    assert match_btn.property("class") == "ToolBtn"
+
+
+def test_tool_buttons_are_connected(window):
+    window.findChild(QtWidgets.QPushButton, "LyricMatchBtn").click()
+    window.findChild(QtWidgets.QPushButton, "DownloadBtn").click()
+    assert window.calls == ["match", "download"]
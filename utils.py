@@ -1,8 +1,11 @@
+import os
 import re
-import json
-import urllib.request
-import urllib.parse
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import pyqtSignal
+
+from search_cache import SearchCache
+from http_client import get_http_client
+from bandwidth import TRAFFIC_INTERACTIVE, TRAFFIC_LYRICS
+from task_executor import Task, LANE_INTERACTIVE, LANE_LYRICS
 
 # -- 辅助函数 --
 def sanitize_filename(name):
@@ -14,8 +17,99 @@ def ms_to_str(ms):
     s = ms // 1000
     return f"{s//60:02}:{s%60:02}"
 
-# --- 功能线程 ---
-class LyricListSearchWorker(QThread):
+def lyric_sidecar_paths(lrc_path):
+    """歌词附属文件：(翻译歌词 .tlrc, 逐字歌词 .yrc)"""
+    base = os.path.splitext(lrc_path)[0]
+    return base + ".tlrc", base + ".yrc"
+
+def get_app_data_dir():
+    """应用数据目录（缓存、索引等），不存在时自动创建"""
+    path = os.path.join(os.path.expanduser("~"), ".light_music_player")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+# --- 在线搜索 ---
+_search_cache = None
+
+def get_search_cache():
+    """全局共享的在线搜索缓存（主搜索框和歌词搜索对话框共用）"""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(disk_path=os.path.join(get_app_data_dir(), "search_cache.db"))
+    return _search_cache
+
+def search_songs_page(keyword, offset=0, limit=30, search_type=1, traffic_class=TRAFFIC_INTERACTIVE):
+    """在网易云搜索一页歌曲，返回 {'songs': [...], 'total': 总条数}；命中缓存时不发请求"""
+    cache = get_search_cache()
+    key = cache.make_key(keyword, search_type, offset, limit)
+    page = cache.get(key)
+    if isinstance(page, dict):
+        return page
+
+    url = "http://music.163.com/api/search/get/web?csrf_token="
+    res = get_http_client().post_json(url, data={
+        's': keyword,
+        'type': search_type,
+        'offset': offset,
+        'total': 'true',
+        'limit': limit
+    }, traffic_class=traffic_class)
+
+    results = [] 
+    total = 0
+    if res.get('result') and res['result'].get('songs'):
+        total = res['result'].get('songCount', 0)
+        for s in res['result']['songs']:
+            artist = s['artists'][0]['name'] if s['artists'] else "未知"
+            duration = s.get('duration', 0)
+            results.append({
+                'name': s['name'],
+                'artist': artist,
+                'id': s['id'],
+                'duration': duration,
+                'duration_str': ms_to_str(duration),
+                'source': 'online'
+            })
+    page = {'songs': results, 'total': max(total, offset + len(results))}
+    cache.put(key, page)
+    return page
+
+def search_songs_online(keyword, offset=0, limit=15, search_type=1, traffic_class=TRAFFIC_INTERACTIVE):
+    """在网易云搜索歌曲，只返回歌曲列表"""
+    return search_songs_page(keyword, offset, limit, search_type, traffic_class)['songs']
+
+# --- 歌词下载 ---
+def download_lyrics(sid, path, token=None):
+    """下载歌词并写到 path（翻译、逐字歌词写到同名附属文件），返回 lrc 文本；没有歌词时返回 None
+
+    同一首歌以前下载过（无论保存在哪个路径）就直接从歌词仓库取，不访问网络。
+    """
+    # lyric_store 依赖本模块的辅助函数，在这里导入避免循环导入
+    from lyric_store import get_lyric_store
+    store = get_lyric_store()
+    entry = store.bind(sid, path)
+    if entry is not None:
+        return entry['lrc']
+
+    url = "http://music.163.com/api/song/lyric"
+    # tv: 翻译歌词，kv/yv: 逐字歌词
+    res = get_http_client().get_json(url, params={
+        'os': 'pc', 'id': sid, 'lv': -1, 'kv': -1, 'tv': -1, 'yv': -1
+    }, traffic_class=TRAFFIC_LYRICS)
+    lrc = (res.get('lrc') or {}).get('lyric')
+    if not lrc or (token is not None and token.is_canceled):
+        return None
+    tlyric = (res.get('tlyric') or {}).get('lyric') or ""
+    # yrc 比 klyric 精确，优先使用
+    word_lyric = ((res.get('yrc') or {}).get('lyric')
+                  or (res.get('klyric') or {}).get('lyric') or "")
+    store.put(sid, lrc, tlyric, word_lyric)
+    store.bind(sid, path)
+    return lrc
+
+# --- 功能任务（在共享执行器的线程池中运行） ---
+class LyricListSearchWorker(Task):
+    lane = LANE_INTERACTIVE
     search_finished = pyqtSignal(list)
 
     def __init__(self, keyword):
@@ -24,38 +118,38 @@ class LyricListSearchWorker(QThread):
 
     def run(self):
         try:
-            url = "http://music.163.com/api/search/get/web?csrf_token="
-            headers = {"User-Agent": 'Mozilla/5.0'}
-            data = urllib.parse.urlencode({
-                's': self.keyword,
-                'type': 1,
-                'offset': 0,
-                'total': 'true',
-                'limit': 15
-            }).encode('utf-8')
-
-            req = urllib.request.Request(url, data=data, headers=headers)
-            with urllib.request.urlopen(req, timeout=10) as f:
-                res = json.loads(f.read().decode('utf-8'))
-
-            results = [] 
-            if res.get('result') and res['result'].get('songs'):
-                for s in res['result']['songs']:
-                    artist = s['artists'][0]['name'] if s['artists'] else "未知"
-                    duration = s.get('duration', 0)
-                    results.append({
-                        'name': s['name'],
-                        'artist': artist,
-                        'id': s['id'],
-                        'duration': duration,
-                        'duration_str': ms_to_str(duration)
-                    })
-            self.search_finished.emit(results)
+            results = search_songs_online(self.keyword)
+            if not self.is_canceled:
+                self.search_finished.emit(results)
         except Exception as e:
             print(f"歌词搜索错误: {e}")
-            self.search_finished.emit([])
+            if not self.is_canceled:
+                self.search_finished.emit([])
+
+class SearchPageWorker(Task):
+    lane = LANE_INTERACTIVE
+    page_finished = pyqtSignal(int, object)  # 页码, {'songs', 'total'}；失败时为 None
+
+    def __init__(self, keyword, page, page_size):
+        super().__init__()
+        self.keyword = keyword
+        self.page = page
+        self.page_size = page_size
+        # 后面的页排在第一页之后
+        self.priority = 10 - min(page, 10)
+
+    def run(self):
+        try:
+            data = search_songs_page(self.keyword, self.page * self.page_size, self.page_size)
+            if not self.is_canceled:
+                self.page_finished.emit(self.page, data)
+        except Exception as e:
+            print(f"分页搜索错误: {e}")
+            if not self.is_canceled:
+                self.page_finished.emit(self.page, None)
 
-class LyricDownloader(QThread):
+class LyricDownloader(Task):
+    lane = LANE_LYRICS
     finished_signal = pyqtSignal(str)
 
     def __init__(self, sid, path):
@@ -65,15 +159,8 @@ class LyricDownloader(QThread):
 
     def run(self):
         try:
-            url = f"http://music.163.com/api/song/lyric?os=pc&id={self.sid}&lv=-1&kv=-1"
-            req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req, timeout=10) as f:
-                res = json.loads(f.read().decode('utf-8'))
-
-            if 'lrc' in res:
-                lrc = res['lrc']['lyric']
-                with open(self.path, 'w', encoding='utf-8') as f:
-                    f.write(lrc)
+            lrc = download_lyrics(self.sid, self.path, self.token)
+            if lrc is not None and not self.is_canceled:
                 self.finished_signal.emit(lrc)
         except Exception as e:
             print(f"歌词下载错误: {e}")
@@ -0,0 +1,305 @@
+import time
+import threading
+import multiprocessing
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from bandwidth import get_bandwidth_scheduler, TRAFFIC_BULK, TRAFFIC_INTERACTIVE
+
+# 工作进程异常退出后，进行中的任务最多自动重新提交几次
+MAX_JOB_RETRIES = 2
+# 一分钟内最多自动重启几次；超过后不再重启，下载回到主进程中运行
+MAX_RESTARTS_PER_MINUTE = 3
+# 工作进程向主进程报告实时下载速度的间隔（秒）
+THROUGHPUT_REPORT_INTERVAL = 1.0
+
+# 管道消息（主进程 -> 工作进程），都是 dict，'op' 为以下之一：
+#   download  {'job', 'args'}     开始下载，args 为 BilibiliDownloader 的参数
+#   cancel    {'job'}             取消下载（同时终止它的 ffmpeg 进程）
+#   bandwidth {'budgets', 'interactive'}  同步限速和主进程中进行中的交互请求数
+#   shutdown  {}
+# 工作进程 -> 主进程，都是 tuple，第一项为事件名：
+#   ('progress', job, DownloadProgress)  ('files', job, [文件名])
+#   ('finished', job, 路径, 说明)  ('error', job, 信息)  ('done', job)
+#   ('throughput', {类别: 字节/秒})
+
+
+# --- 工作进程 ---
+def worker_main(conn):
+    """工作进程入口：在独立进程中运行 yt-dlp 下载和 ffmpeg 后处理，GIL 与主界面分开"""
+    # 只在工作进程中导入 yt-dlp 相关模块
+    from PyQt5.QtCore import Qt
+    from bilibili_downloader import BilibiliDownloader
+
+    send_lock = threading.Lock()
+    downloaders = {}
+    scheduler = get_bandwidth_scheduler()
+
+    def send(*event):
+        with send_lock:
+            try:
+                conn.send(event)
+            except (OSError, ValueError):
+                pass  # 主进程已退出
+
+    def run_job(job_id, downloader):
+        downloader._execute()
+        downloaders.pop(job_id, None)
+        send('files', job_id, sorted(downloader.part_files))
+        send('done', job_id)
+
+    def start_job(job_id, args):
+        downloader = BilibiliDownloader(**args)
+        known_files = set()
+
+        def on_progress(progress):
+            if len(downloader.part_files) != len(known_files):
+                known_files.update(downloader.part_files)
+                send('files', job_id, sorted(known_files))
+            send('progress', job_id, progress)
+
+        # 工作进程没有 Qt 事件循环，信号必须在发出的线程中直接调用
+        downloader.progress_signal.connect(on_progress, Qt.DirectConnection)
+        downloader.finished_signal.connect(lambda path, msg: send('finished', job_id, path, msg),
+                                           Qt.DirectConnection)
+        downloader.error_signal.connect(lambda msg: send('error', job_id, msg), Qt.DirectConnection)
+        downloaders[job_id] = downloader
+        threading.Thread(target=run_job, args=(job_id, downloader), daemon=True,
+                         name=f"download-{job_id}").start()
+
+    def report_throughput():
+        reported = False
+        while True:
+            time.sleep(THROUGHPUT_REPORT_INTERVAL)
+            rates = scheduler.throughput()
+            if downloaders or reported:
+                send('throughput', {TRAFFIC_BULK: rates[TRAFFIC_BULK]})
+                reported = bool(downloaders)
+
+    threading.Thread(target=report_throughput, daemon=True, name="throughput").start()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            message = {'op': 'shutdown'}
+        op = message.get('op')
+        if op == 'download':
+            start_job(message['job'], message['args'])
+        elif op == 'cancel':
+            downloader = downloaders.get(message['job'])
+            if downloader is not None:
+                downloader.cancel_download()
+        elif op == 'bandwidth':
+            scheduler.set_budgets(message['budgets'])
+            scheduler.set_remote_active(TRAFFIC_INTERACTIVE, message['interactive'])
+        elif op == 'shutdown':
+            for downloader in list(downloaders.values()):
+                downloader.cancel_download()
+            break
+
+
+# --- 主进程中的代理：接口与 BilibiliDownloader 相同，DownloadManager 不需要区分 ---
+class RemoteDownloadTask(QObject):
+    progress_signal = pyqtSignal(object)    # DownloadProgress
+    finished_signal = pyqtSignal(str, str)  # 路径和说明
+    error_signal = pyqtSignal(str)          # 错误信息
+    finished = pyqtSignal()
+
+    def __init__(self, host, args):
+        super().__init__()
+        self.host = host
+        self.args = args
+        self.job_id = None
+        self.part_files = set()
+        self.retries = 0
+        self._canceled = False
+        self._started = False
+        self._done = threading.Event()
+
+    @property
+    def is_canceled(self):
+        return self._canceled
+
+    def start(self):
+        self._started = True
+        self.host.submit(self)
+
+    def cancel(self):
+        self._canceled = True
+        self.host.cancel(self)
+
+    def cancel_download(self):
+        self.cancel()
+
+    def isRunning(self):
+        return self._started and not self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _mark_done(self):
+        if not self._done.is_set():
+            self._done.set()
+            self.finished.emit()
+
+
+# --- 工作进程宿主：启动、监视并在异常退出时重启工作进程 ---
+class WorkerHost:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._send_lock = threading.Lock()
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._conn = None
+        self._tasks = {}       # 任务 ID -> RemoteDownloadTask（已提交、尚未结束）
+        self._next_id = 1
+        self._restarts = []    # 最近自动重启的时间
+        self._closing = False
+        self.available = True  # 多次崩溃后为 False，调用方应改为在主进程中下载
+        self.scheduler = get_bandwidth_scheduler()
+        self.scheduler.add_listener(self._on_bandwidth_changed)
+
+    def create_download(self, **args):
+        return RemoteDownloadTask(self, args)
+
+    # -- 进程管理 --
+    def _ensure_started(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=worker_main, args=(child_conn,),
+                                        name="download-worker", daemon=True)
+        process.start()
+        # 关闭主进程中的子端，工作进程退出时 recv() 才会收到 EOF
+        child_conn.close()
+        self._process, self._conn = process, parent_conn
+        threading.Thread(target=self._read_loop, args=(process, parent_conn), daemon=True,
+                         name="worker-host-reader").start()
+        budgets = self.scheduler.budgets()
+        self._send({'op': 'bandwidth', 'budgets': budgets,
+                    'interactive': self.scheduler.active_count(TRAFFIC_INTERACTIVE)})
+
+    def _send(self, message):
+        with self._send_lock:
+            if self._conn is None:
+                return False
+            try:
+                self._conn.send(message)
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def submit(self, task):
+        with self._lock:
+            if self._closing:
+                task._mark_done()
+                return
+            if task.job_id is None:
+                task.job_id = self._next_id
+                self._next_id += 1
+            self._tasks[task.job_id] = task
+            self._ensure_started()
+            self._send({'op': 'download', 'job': task.job_id, 'args': task.args})
+
+    def cancel(self, task):
+        with self._lock:
+            if task.job_id in self._tasks:
+                self._send({'op': 'cancel', 'job': task.job_id})
+
+    def shutdown(self, timeout=3):
+        """退出程序：通知工作进程取消下载并退出，超时后强制结束"""
+        with self._lock:
+            self._closing = True
+            process = self._process
+            self._send({'op': 'shutdown'})
+        self.scheduler.remove_listener(self._on_bandwidth_changed)
+        if process is not None:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+
+    # -- 事件 --
+    def _read_loop(self, process, conn):
+        while True:
+            try:
+                event = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._dispatch(event)
+        process.join(1)
+        self._on_worker_exit(process)
+
+    def _dispatch(self, event):
+        kind = event[0]
+        if kind == 'throughput':
+            self.scheduler.set_remote_throughput(event[1])
+            return
+        task = self._tasks.get(event[1])
+        if task is None:
+            return
+        if kind == 'progress':
+            task.progress_signal.emit(event[2])
+        elif kind == 'files':
+            task.part_files.update(event[2])
+        elif kind == 'finished':
+            task.finished_signal.emit(event[2], event[3])
+        elif kind == 'error':
+            task.error_signal.emit(event[2])
+        elif kind == 'done':
+            with self._lock:
+                self._tasks.pop(task.job_id, None)
+            task._mark_done()
+
+    def _on_worker_exit(self, process):
+        with self._lock:
+            if process is not self._process:
+                return
+            self._process = None
+            self._conn = None
+            self.scheduler.set_remote_throughput({TRAFFIC_BULK: 0.0})
+            tasks = list(self._tasks.values())
+            self._tasks.clear()
+            if self._closing:
+                for task in tasks:
+                    task._mark_done()
+                return
+
+            print(f"下载工作进程异常退出（退出码 {process.exitcode}）")
+            now = time.monotonic()
+            self._restarts = [t for t in self._restarts if now - t < 60]
+            can_restart = len(self._restarts) < MAX_RESTARTS_PER_MINUTE
+            if can_restart:
+                self._restarts.append(now)
+            else:
+                self.available = False
+            for task in tasks:
+                if task.is_canceled:
+                    task._mark_done()
+                elif can_restart and task.retries < MAX_JOB_RETRIES:
+                    # 重新提交到新进程，已下载的部分由 .part 文件续传
+                    task.retries += 1
+                    self.submit(task)
+                else:
+                    task.error_signal.emit("下载进程异常退出")
+                    task._mark_done()
+
+    def _on_bandwidth_changed(self, budgets, interactive):
+        # 主进程中的交互请求也要让工作进程里的下载让路
+        if self._process is not None:
+            self._send({'op': 'bandwidth', 'budgets': budgets, 'interactive': interactive})
+
+
+_host = None
+_host_lock = threading.Lock()
+
+def get_worker_host():
+    """全局共享的下载工作进程宿主（第一次提交任务时才启动进程）"""
+    global _host
+    if _host is None:
+        with _host_lock:
+            if _host is None:
+                _host = WorkerHost()
+    return _host
+
+def shutdown_worker_host():
+    if _host is not None:
+        _host.shutdown()